@@ -0,0 +1,209 @@
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+import requests
+from requests.adapters import HTTPAdapter
+
+SPOOL_DIR = "alert_spool"
+MAX_SPOOL_FILES = 500
+
+SNAPSHOT_WIDTH = 640
+JPEG_QUALITY = 80
+
+REQUEST_TIMEOUT = (3, 10)
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+def encode_snapshot(frame, max_width=SNAPSHOT_WIDTH, quality=JPEG_QUALITY):
+    height, width = frame.shape[:2]
+    if max_width and width > max_width:
+        scale = max_width / width
+        frame = cv2.resize(frame, (max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def retry_after(response):
+    # Seconds from a Retry-After header, or 0 if it is missing or a date.
+    try:
+        return min(float(response.headers.get("Retry-After", 0)), BACKOFF_MAX)
+    except ValueError:
+        return 0
+
+
+class AlertDispatcher:
+    # One background worker owns a keep-alive session. Every alert is written
+    # to the on-disk spool before delivery is attempted and only removed once
+    # the gateway accepts it, so a gateway outage delays alerts instead of
+    # losing them. The spool is replayed oldest-first, including after a restart.
+    # Snapshots and clips are sent as multipart file parts, not base64 JSON.
+
+    def __init__(self, url, camera_id, location, spool_dir=SPOOL_DIR,
+                 snapshot_width=SNAPSHOT_WIDTH, jpeg_quality=JPEG_QUALITY,
+                 max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT):
+        self.url = url
+        self.camera_id = camera_id
+        self.location = location
+        self.spool_dir = spool_dir
+        self.snapshot_width = snapshot_width
+        self.jpeg_quality = jpeg_quality
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self._pending = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, confidence, occurred_at=None, clip_path=None):
+        # Only a copy happens on the caller's thread; encoding is done by the worker.
+        occurred_at = occurred_at or datetime.datetime.utcnow().isoformat()
+        self._pending.put((frame.copy(), float(confidence), occurred_at, clip_path))
+
+    def backlog(self):
+        return self._pending.qsize() + len(self._spooled())
+
+    def close(self, timeout=10):
+        self._stop.set()
+        self._pending.put(None)
+        self._thread.join(timeout)
+        self.session.close()
+
+    def _spooled(self):
+        return sorted(f for f in os.listdir(self.spool_dir) if f.endswith(".json"))
+
+    def _spool(self, frame, confidence, occurred_at, clip_path):
+        # The JPEG is written before its metadata file, so every listed
+        # .json has its snapshot next to it.
+        name = f"{time.time_ns():020d}"
+        with open(os.path.join(self.spool_dir, name + ".jpg"), "wb") as f:
+            f.write(encode_snapshot(frame, self.snapshot_width, self.jpeg_quality))
+
+        payload = {
+            "camera_id": self.camera_id,
+            "location": self.location,
+            "confidence": f"{confidence*100:.1f}",
+            "occurred_at": occurred_at,
+            "snapshot": name + ".jpg",
+            "clip_path": clip_path,
+        }
+        tmp_path = os.path.join(self.spool_dir, name + ".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, os.path.join(self.spool_dir, name + ".json"))
+
+        spooled = self._spooled()
+        for stale in spooled[:max(0, len(spooled) - MAX_SPOOL_FILES)]:
+            print(f"\n>> Alert spool full, dropping {stale}")
+            self._remove(os.path.join(self.spool_dir, stale))
+
+    def _remove(self, path):
+        # The clip is deleted with the alert, whether it was delivered or dropped.
+        try:
+            with open(path) as f:
+                clip_path = json.load(f).get("clip_path")
+        except (OSError, ValueError):
+            clip_path = None
+        snapshot = os.path.splitext(path)[0] + ".jpg"
+        for leftover in (snapshot, clip_path):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+        os.remove(path)
+
+    def _post(self, payload):
+        if "image" in payload:
+            # Spooled by an older version as base64 JSON.
+            return self.session.post(self.url, json=payload, timeout=self.timeout)
+
+        fields = {k: payload[k] for k in ("camera_id", "location", "confidence", "occurred_at")}
+        files = {"snapshot": (payload["snapshot"],
+                              open(os.path.join(self.spool_dir, payload["snapshot"]), "rb"), "image/jpeg")}
+        clip_path = payload.get("clip_path")
+        try:
+            if clip_path and os.path.exists(clip_path):
+                files["video"] = (os.path.basename(clip_path), open(clip_path, "rb"), "video/mp4")
+            return self.session.post(self.url, data=fields, files=files, timeout=self.timeout)
+        finally:
+            for _, handle, _ in files.values():
+                handle.close()
+
+    def _send(self, path):
+        with open(path) as f:
+            payload = json.load(f)
+        if "snapshot" in payload and not os.path.exists(os.path.join(self.spool_dir, payload["snapshot"])):
+            print(f"\n>> Spooled snapshot for {os.path.basename(path)} is missing, dropping alert")
+            return True
+
+        delay = BACKOFF_BASE
+        for attempt in range(1, self.max_retries + 1):
+            wait = delay
+            try:
+                response = self._post(payload)
+                if response.status_code < 400:
+                    return True
+                if response.status_code < 500:
+                    print(f"\n>> Alert rejected ({response.status_code}): {response.text[:200]}")
+                    return True
+                print(f"\n>> Alert gateway error {response.status_code} (attempt {attempt}): {response.text[:200]}")
+                wait = max(delay, retry_after(response))
+            except (requests.RequestException, OSError) as e:
+                print(f"\n>> Alert delivery failed (attempt {attempt}): {e}")
+
+            if attempt == self.max_retries or self._stop.wait(wait):
+                return False
+            delay = min(delay * 2, BACKOFF_MAX)
+        return False
+
+    def _drain_spool(self):
+        for name in self._spooled():
+            path = os.path.join(self.spool_dir, name)
+            if not self._send(path):
+                return False
+            self._remove(path)
+            print("\n>> Alert sent!")
+        return True
+
+    def _spool_pending(self, item=None):
+        while True:
+            if item is not None:
+                try:
+                    self._spool(*item)
+                except (OSError, ValueError) as e:
+                    print(f"\n>> Could not spool alert: {e}")
+                    clip_path = item[3]
+                    if clip_path and os.path.exists(clip_path):
+                        os.remove(clip_path)
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                return
+
+    def _run(self):
+        while not self._stop.is_set():
+            delivered = self._drain_spool()
+            if self._stop.is_set():
+                break
+            # While the gateway is unreachable, wake up periodically so the
+            # spool is replayed as soon as it comes back.
+            try:
+                item = self._pending.get(timeout=None if delivered else BACKOFF_MAX)
+            except queue.Empty:
+                continue
+            self._spool_pending(item)
+        # Anything still in memory goes to disk and is replayed on the next start.
+        self._spool_pending()
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark of Keras call paths for single-sample inference.
+
+    python bench_call_overhead.py [--model accident_video_model.h5] [--iters 200]
+
+Times the frame backbone and the sequence head through model.predict(),
+an eager model(x, training=False) call and the traced call the detector
+uses. Runs on random weights when no weights file is given; the call
+overhead does not depend on the weights.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from detector_model import MobileNetV2_LSTM, KerasDetector, load_detector
+
+
+def _time_calls(fn, x, iters):
+    fn(x)
+    samples = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn(x)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 95)
+
+
+def run(model_path=None, iters=200):
+    model = load_detector(model_path) if model_path else MobileNetV2_LSTM()
+    detector = KerasDetector(model=model)
+
+    frame = np.random.rand(1, detector.img_size, detector.img_size, 3).astype(np.float32)
+    window = np.random.rand(1, detector.sequence_length, detector.embedding_dim).astype(np.float32)
+
+    print(f"\n========= CALL OVERHEAD ({iters} calls) =========")
+    print(f"{'graph':<10}{'path':<12}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, submodel, traced, x in [
+        ("backbone", detector.backbone, detector.embed, frame),
+        ("head", detector.head, detector.score, window),
+    ]:
+        paths = [
+            ("predict", lambda v: submodel.predict(v, verbose=0)),
+            ("eager", lambda v: submodel(v, training=False)),
+            ("traced", traced),
+        ]
+        results = {}
+        for path, fn in paths:
+            results[path] = _time_calls(fn, x, iters)
+            p50, p95 = results[path]
+            print(f"{name:<10}{path:<12}{p50:>10.2f}{p95:>10.2f}")
+        saved = results["predict"][0] - results["traced"][0]
+        print(f"{name:<10}{'saved':<12}{saved:>10.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare Keras single-sample call paths.")
+    parser.add_argument("--model", default=None, help="weights file (random weights if omitted)")
+    parser.add_argument("--iters", type=int, default=200, help="timed calls per path")
+    args = parser.parse_args()
+
+    run(args.model, args.iters)
@@ -0,0 +1,173 @@
+"""
+Throughput benchmark for the CCTV detector pipeline on synthetic video.
+
+    python benchmark.py --resolutions 640x360 1280x720 1920x1080 --fps 15 30 \\
+        --sequence-lengths 50 --img-sizes 224 160 128 --alphas 1.0 0.5 --batch-sizes 1 8 --out bench.jsonl
+
+For every combination it decodes a generated clip, preprocesses, runs the
+frame backbone (batch_size frames per call) and scores the sequence head
+on each full window, exactly like the detector, using random weights.
+One JSON object per run is appended to --out with FPS, per-frame and
+per-batch latency, CPU utilisation, current RSS and peak RSS.
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import tempfile
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from detector_model import MobileNetV2_LSTM, KerasDetector, preprocess_frame
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SYNTHETIC_SECONDS = 10
+
+
+def synthetic_video(path, width, height, fps, seconds=SYNTHETIC_SECONDS, seed=0):
+    # Moving blocks over a noisy background, so the codec has real work to do.
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    background = rng.integers(0, 80, (height, width, 3), dtype=np.uint8)
+    boxes = [(rng.integers(0, width), rng.integers(0, height), rng.integers(-8, 9), rng.integers(-8, 9))
+             for _ in range(6)]
+    size = max(16, width // 12)
+    for i in range(int(fps * seconds)):
+        frame = background.copy()
+        for n, (x, y, dx, dy) in enumerate(boxes):
+            cx, cy = int(x + dx * i) % width, int(y + dy * i) % height
+            cv2.rectangle(frame, (cx, cy), (cx + size, cy + size),
+                          (40 * n % 255, 255 - 30 * n, 120), -1)
+        frame ^= rng.integers(0, 16, frame.shape, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _rss_mb():
+    # Current resident set size, or None where it cannot be read.
+    if psutil:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _max_rss_mb():
+    # Peak resident set size of the process so far (ru_maxrss is in KiB on Linux).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_pipeline(video_path, detector, batch_size):
+    cap = cv2.VideoCapture(video_path)
+    embeddings = deque(maxlen=detector.sequence_length)
+    pending = []
+    batch_ms = []
+    frame_ms = []
+    frames = 0
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    def flush():
+        t0 = time.perf_counter()
+        for emb in detector.embed(np.stack(pending)):
+            embeddings.append(emb)
+            if len(embeddings) == detector.sequence_length:
+                detector.score(np.stack(embeddings)[np.newaxis])
+        ms = (time.perf_counter() - t0) * 1000
+        batch_ms.append(ms)
+        frame_ms.append(ms / len(pending))
+        pending.clear()
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        pending.append(preprocess_frame(frame, detector.img_size))
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+    cap.release()
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return {
+        "frames": frames,
+        "fps": frames / wall if wall > 0 else 0.0,
+        # Backbone plus head time per frame, amortised over its batch.
+        "frame_ms_p50": float(np.percentile(frame_ms, 50)) if frame_ms else None,
+        "frame_ms_p95": float(np.percentile(frame_ms, 95)) if frame_ms else None,
+        "batch_ms_p95": float(np.percentile(batch_ms, 95)) if batch_ms else None,
+        "cpu_percent": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "rss_mb": _rss_mb(),
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+
+def run(resolutions, fps_values, sequence_lengths, img_sizes, batch_sizes, out_path, seconds, alphas=(1.0,)):
+    with tempfile.TemporaryDirectory() as tmp:
+        videos = {}
+        for (width, height), fps in itertools.product(resolutions, fps_values):
+            path = os.path.join(tmp, f"synthetic_{width}x{height}_{fps}.mp4")
+            print(f"Generating {width}x{height} @ {fps} fps...")
+            videos[(width, height, fps)] = synthetic_video(path, width, height, fps, seconds)
+
+        with open(out_path, "a") as out:
+            for sequence_length, img_size, alpha in itertools.product(sequence_lengths, img_sizes, alphas):
+                model = MobileNetV2_LSTM(input_shape=(sequence_length, img_size, img_size, 3), alpha=alpha)
+                detector = KerasDetector(model=model)
+                detector.warmup()
+                for (width, height, fps), batch_size in itertools.product(videos, batch_sizes):
+                    result = {
+                        "resolution": f"{width}x{height}",
+                        "source_fps": fps,
+                        "sequence_length": sequence_length,
+                        "img_size": img_size,
+                        "alpha": alpha,
+                        "batch_size": batch_size,
+                        "cpu_count": os.cpu_count(),
+                    }
+                    result.update(run_pipeline(videos[(width, height, fps)], detector, batch_size))
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                    rss = f"{result['rss_mb']:7.1f}" if result['rss_mb'] is not None else "      -"
+                    print(f"{result['resolution']:>10} @{fps:>3} | T={sequence_length:<3} {img_size}px a={alpha} "
+                          f"batch={batch_size:<3} | {result['fps']:7.1f} fps | "
+                          f"p95 {result['frame_ms_p95']:7.2f} ms/frame | CPU {result['cpu_percent']:5.0f}% | "
+                          f"RSS {rss} MB (peak {result['max_rss_mb']:.1f})")
+    print(f"Saved results to: {out_path}")
+
+
+def _resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the CCTV detector on synthetic video.")
+    parser.add_argument("--resolutions", nargs="+", type=_resolution, default=[(1280, 720)])
+    parser.add_argument("--fps", nargs="+", type=int, default=[30])
+    parser.add_argument("--sequence-lengths", nargs="+", type=int, default=[50])
+    parser.add_argument("--img-sizes", nargs="+", type=int, default=[224])
+    parser.add_argument("--alphas", nargs="+", type=float, default=[1.0], help="MobileNetV2 width multipliers")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1])
+    parser.add_argument("--seconds", type=float, default=SYNTHETIC_SECONDS, help="length of each synthetic clip")
+    parser.add_argument("--out", default="bench.jsonl", help="JSON-lines results file")
+    args = parser.parse_args()
+
+    run(args.resolutions, args.fps, args.sequence_lengths, args.img_sizes, args.batch_sizes,
+        args.out, args.seconds, args.alphas)
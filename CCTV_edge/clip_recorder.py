@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+CLIP_DIR = "alert_clips"
+PRE_EVENT_SECONDS = 10
+POST_EVENT_SECONDS = 3
+CLIP_WIDTH = 640
+CLIP_JPEG_QUALITY = 70
+MAX_RING_BYTES = 48 * 1024 * 1024
+HANDOFF_QUEUE_SIZE = 8
+
+
+class ClipRecorder:
+    # The inference loop only hands over a frame copy. A background thread
+    # downscales and JPEG-compresses it into a ring bounded both by age and by
+    # total bytes, and a separate single-worker pool builds the MP4 once the
+    # post-event seconds have arrived.
+
+    def __init__(self, out_dir=CLIP_DIR, pre_seconds=PRE_EVENT_SECONDS, post_seconds=POST_EVENT_SECONDS,
+                 width=CLIP_WIDTH, jpeg_quality=CLIP_JPEG_QUALITY, max_bytes=MAX_RING_BYTES):
+        self.out_dir = out_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self.dropped_frames = 0
+
+        os.makedirs(out_dir, exist_ok=True)
+
+        self._ring = deque()
+        self._ring_bytes = 0
+        self._events = []
+        self._lock = threading.Lock()
+        self._handoff = queue.Queue(maxsize=HANDOFF_QUEUE_SIZE)
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-encoder")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="clip-recorder", daemon=True)
+        self._thread.start()
+
+    def add(self, frame, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        try:
+            self._handoff.put_nowait((timestamp, frame.copy()))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def trigger(self, on_clip, timestamp=None):
+        # on_clip(path) is called from the encoder thread, or with None if no
+        # frames could be collected.
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._events.append((timestamp, on_clip))
+
+    def ring_bytes(self):
+        return self._ring_bytes
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._encoder.shutdown(wait=True)
+
+    def _compress(self, frame):
+        height, width = frame.shape[:2]
+        if self.width and width > self.width:
+            frame = cv2.resize(frame, (self.width, int(height * self.width / width)),
+                               interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        return buffer.tobytes() if ok else None
+
+    def _append(self, timestamp, jpeg):
+        self._ring.append((timestamp, jpeg))
+        self._ring_bytes += len(jpeg)
+        horizon = timestamp - (self.pre_seconds + self.post_seconds)
+        while self._ring and (self._ring[0][0] < horizon or self._ring_bytes > self.max_bytes):
+            _, old = self._ring.popleft()
+            self._ring_bytes -= len(old)
+
+    def _flush_ready_events(self, now, force=False):
+        with self._lock:
+            ready = [e for e in self._events if force or now >= e[0] + self.post_seconds]
+            self._events = [e for e in self._events if e not in ready]
+        for event_time, on_clip in ready:
+            start, end = event_time - self.pre_seconds, event_time + self.post_seconds
+            frames = [(t, jpeg) for t, jpeg in self._ring if start <= t <= end]
+            self._encoder.submit(self._encode, frames, event_time, on_clip)
+
+    def _run(self):
+        latest = time.time()
+        while not self._stop.is_set():
+            try:
+                timestamp, frame = self._handoff.get(timeout=0.2)
+                jpeg = self._compress(frame)
+                if jpeg is not None:
+                    self._append(timestamp, jpeg)
+                latest = timestamp
+            except queue.Empty:
+                latest = max(latest, time.time())
+            self._flush_ready_events(latest)
+        self._flush_ready_events(latest, force=True)
+
+    def _encode(self, frames, event_time, on_clip):
+        if not frames:
+            on_clip(None)
+            return
+        first = cv2.imdecode(np.frombuffer(frames[0][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else 1.0
+
+        # Nanosecond names, like the alert spool, so events in the same second
+        # do not overwrite each other's clips.
+        path = os.path.join(self.out_dir, f"clip_{time.time_ns():020d}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        try:
+            for _, jpeg in frames:
+                writer.write(cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR))
+        finally:
+            writer.release()
+        print(f"\n>> Saved {len(frames)}-frame clip: {path}")
+        on_clip(path)
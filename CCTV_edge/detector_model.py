@@ -0,0 +1,157 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+MODEL_PATH = 'accident_video_model.h5'
+
+# Defaults for weights saved before geometry metadata existed. They match the
+# training notebook (224 px), not the 256 px the detector used to assume.
+SEQUENCE_LENGTH = 50
+IMG_SIZE = 224
+ALPHA = 1.0
+
+# TensorFlow is imported inside the Keras helpers so the TFLite runtime path
+# never pays for it.
+
+
+def MobileNetV2_LSTM(input_shape=(SEQUENCE_LENGTH, IMG_SIZE, IMG_SIZE, 3), num_classes=1, backbone_weights=None,
+                     alpha=ALPHA):
+    import tensorflow as tf
+    from tensorflow.keras import layers, Model
+
+    inputs = tf.keras.Input(shape=input_shape)
+    cnn_base = tf.keras.applications.MobileNetV2(
+        input_shape=input_shape[1:],
+        alpha=alpha,
+        include_top=False,
+        weights=backbone_weights
+    )
+    cnn_base.trainable = False
+
+    x = layers.TimeDistributed(cnn_base)(inputs)
+    x = layers.TimeDistributed(layers.GlobalAveragePooling2D())(x)
+    x = layers.LSTM(64, dropout=0.3)(x)
+    x = layers.Dense(32, activation='relu')(x)
+    x = layers.Dropout(0.5)(x)
+    outputs = layers.Dense(num_classes, activation='sigmoid')(x)
+
+    return Model(inputs, outputs)
+
+
+def geometry_path(model_path=MODEL_PATH):
+    return os.path.splitext(model_path)[0] + '.json'
+
+
+def save_geometry(model_path, sequence_length, img_size, alpha=ALPHA, **extra):
+    geometry = {"sequence_length": int(sequence_length), "img_size": int(img_size), "alpha": float(alpha)}
+    geometry.update(extra)
+    with open(geometry_path(model_path), "w") as f:
+        json.dump(geometry, f, indent=2)
+    return geometry
+
+
+def load_geometry(model_path=MODEL_PATH):
+    geometry = {"sequence_length": SEQUENCE_LENGTH, "img_size": IMG_SIZE, "alpha": ALPHA}
+    path = geometry_path(model_path)
+    if os.path.exists(path):
+        with open(path) as f:
+            geometry.update(json.load(f))
+    else:
+        print(f"No geometry metadata at {path}; assuming {geometry}")
+    return geometry
+
+
+def build_from_geometry(geometry, backbone_weights=None):
+    size = geometry["img_size"]
+    return MobileNetV2_LSTM(input_shape=(geometry["sequence_length"], size, size, 3),
+                            backbone_weights=backbone_weights, alpha=geometry["alpha"])
+
+
+def load_detector(model_path=MODEL_PATH):
+    geometry = load_geometry(model_path)
+    model = build_from_geometry(geometry)
+    model.compile(optimizer='adam', loss="binary_crossentropy")
+    try:
+        model.load_weights(model_path)
+    except ValueError as e:
+        raise ValueError(f"{model_path} does not match geometry {geometry}; "
+                         f"check {geometry_path(model_path)}") from e
+    return model
+
+
+def split_model(model):
+    # The backbone only ever sees one frame at a time, so it can be run once
+    # per frame and the LSTM head slid over the cached embeddings.
+    import tensorflow as tf
+    from tensorflow.keras import layers, Model
+
+    time_distributed = [l for l in model.layers if isinstance(l, layers.TimeDistributed)]
+    cnn_base = time_distributed[0].layer
+
+    frame_input = tf.keras.Input(shape=model.input_shape[2:])
+    embedding = layers.GlobalAveragePooling2D()(cnn_base(frame_input))
+    backbone = Model(frame_input, embedding)
+
+    head_layers = model.layers[model.layers.index(time_distributed[-1]) + 1:]
+    seq_input = tf.keras.Input(shape=(model.input_shape[1], backbone.output_shape[-1]))
+    x = seq_input
+    for layer in head_layers:
+        x = layer(x)
+    head = Model(seq_input, x)
+
+    return backbone, head
+
+
+def preprocess_frame(frame, img_size=IMG_SIZE):
+    resized = cv2.resize(frame, (img_size, img_size))
+    rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    return rgb.astype(np.float32) / 255.0
+
+
+def traced_call(model, input_shape):
+    # model.predict() builds a data adapter and callbacks on every call, which
+    # dominates single-sample latency. A tf.function with a fixed signature is
+    # traced once and then dispatches straight into the graph.
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec((None,) + tuple(input_shape), tf.float32)])
+    def call(x):
+        return model(x, training=False)
+
+    return call
+
+
+class KerasDetector:
+    backend = 'keras'
+
+    def __init__(self, model_path=MODEL_PATH, model=None):
+        self.model = model if model is not None else load_detector(model_path)
+        self.backbone, self.head = split_model(self.model)
+        self.sequence_length = self.model.input_shape[1]
+        self.img_size = self.model.input_shape[2]
+        self.embedding_dim = self.backbone.output_shape[-1]
+
+        self._embed_fn = traced_call(self.backbone, (self.img_size, self.img_size, 3))
+        self._score_fn = traced_call(self.head, (self.sequence_length, self.embedding_dim))
+
+    def embed(self, frames):
+        return self._embed_fn(frames).numpy()
+
+    def score(self, windows):
+        return self._score_fn(windows).numpy()[:, 0]
+
+    def warmup(self):
+        self.embed(np.zeros((1, self.img_size, self.img_size, 3), dtype=np.float32))
+        self.score(np.zeros((1, self.sequence_length, self.embedding_dim), dtype=np.float32))
+
+
+def load_runtime(model_path=MODEL_PATH, backend='keras', int8=False):
+    if backend == 'tflite':
+        from tflite_detector import TFLiteDetector
+        runtime = TFLiteDetector(model_path, int8=int8)
+    else:
+        runtime = KerasDetector(model_path)
+    runtime.warmup()
+    return runtime
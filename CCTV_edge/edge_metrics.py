@@ -0,0 +1,187 @@
+import csv
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9100
+
+HISTOGRAM_WINDOW = 4096
+LOG_QUEUE_SIZE = 10000
+LOG_FLUSH_INTERVAL = 1.0
+
+
+class RollingHistogram:
+    # Percentiles over the last `window` samples in a fixed ring buffer, plus
+    # lifetime count/mean/min/max, so memory stays flat on long-running cameras.
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self._samples = np.zeros(window, dtype=np.float64)
+        self._next = 0
+        self._filled = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self._samples[self._next] = value
+            self._next = (self._next + 1) % len(self._samples)
+            self._filled = min(self._filled + 1, len(self._samples))
+            self.count += 1
+            self.total += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        with self._lock:
+            if not self._filled:
+                return {f"p{q}": None for q in qs}
+            values = np.percentile(self._samples[:self._filled], qs)
+        return {f"p{q}": float(v) for q, v in zip(qs, values)}
+
+    def snapshot(self):
+        data = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+        data.update(self.percentiles())
+        return data
+
+
+class RateMeter:
+    # Events in the trailing `period` seconds. Old timestamps are dropped from
+    # the left as new ones arrive, and maxlen caps the memory.
+
+    def __init__(self, period=1.0, maxlen=1024):
+        self.period = period
+        self._times = deque(maxlen=maxlen)
+
+    def tick(self, now=None):
+        now = time.time() if now is None else now
+        self._times.append(now)
+        while self._times and now - self._times[0] > self.period:
+            self._times.popleft()
+
+    def rate(self):
+        return len(self._times) / self.period
+
+
+class EdgeMetrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.latency_ms = RollingHistogram()
+        self.fps = RateMeter()
+        self.frames = 0
+        self.inferences = 0
+        self.dropped_frames = 0
+        self.skipped_frames = 0
+        self.window_resets = 0
+        self.queue_depth = 0
+        self.alerts = 0
+
+    def frame(self):
+        self.frames += 1
+        self.fps.tick()
+
+    def inference(self, ms):
+        self.inferences += 1
+        self.latency_ms.add(ms)
+
+    def snapshot(self):
+        uptime = time.time() - self.started_at
+        return {
+            "uptime_s": uptime,
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "fps": self.fps.rate(),
+            "avg_fps": self.frames / uptime if uptime > 0 else 0.0,
+            "latency_ms": self.latency_ms.snapshot(),
+            "queue_depth": self.queue_depth,
+            "dropped_frames": self.dropped_frames,
+            "skipped_frames": self.skipped_frames,
+            "window_resets": self.window_resets,
+            "alerts": self.alerts,
+        }
+
+
+class CsvLogWriter:
+    # Per-frame rows go onto a bounded queue and a background thread appends
+    # them in batches through one open file handle.
+
+    def __init__(self, path, header, flush_interval=LOG_FLUSH_INTERVAL, maxsize=LOG_QUEUE_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped_rows = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(header)
+        self._file.flush()
+
+        self._thread = threading.Thread(target=self._run, name="csv-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, row):
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped_rows += 1
+
+    def backlog(self):
+        return self._queue.qsize()
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if rows:
+            self._writer.writerows(rows)
+            self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._file.close()
+
+
+def serve_metrics(metrics, host=METRICS_HOST, port=METRICS_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            body = json.dumps(metrics.snapshot()).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Metrics endpoint: http://{host}:{port}/metrics")
+    return server
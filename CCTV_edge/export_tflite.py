@@ -0,0 +1,185 @@
+"""
+Convert the CCTV MobileNetV2_LSTM model to TFLite and compare it with Keras.
+
+    python export_tflite.py                                   # float32 backbone + head
+    python export_tflite.py --int8 --calibration clips/*.mp4  # int8, calibrated on footage
+    python export_tflite.py --compare clips/*.mp4             # latency / memory / accuracy report
+
+The model is exported as two graphs, a per-frame backbone and a sequence head
+over the pooled embeddings, which is the shape the live detector runs.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import time
+
+import cv2
+import numpy as np
+
+from detector_model import MODEL_PATH, KerasDetector, load_geometry, load_runtime, preprocess_frame
+from tflite_detector import tflite_paths
+
+CALIBRATION_WINDOWS_PER_VIDEO = 4
+CALIBRATION_FRAMES_PER_WINDOW = 8
+COMPARE_WINDOWS_PER_VIDEO = 5
+CONFIDENCE_THRESHOLD = 0.90
+
+
+def sample_windows(video_paths, sequence_length, img_size, per_video):
+    # Consecutive frames, starting at np.linspace positions like the training notebook.
+    for path in video_paths:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total < sequence_length:
+            cap.release()
+            continue
+        for start in np.linspace(0, total - sequence_length, per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(start))
+            frames = []
+            while len(frames) < sequence_length:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(preprocess_frame(frame, img_size))
+            if len(frames) == sequence_length:
+                yield np.stack(frames)
+        cap.release()
+
+
+def backbone_dataset(windows):
+    # Representative dataset for the backbone: a few frames from each window.
+    def generate():
+        for window in windows:
+            idx = np.linspace(0, len(window) - 1, CALIBRATION_FRAMES_PER_WINDOW).astype(int)
+            for frame in window[idx]:
+                yield [frame[np.newaxis]]
+    return generate
+
+
+def head_dataset(embeddings):
+    # Representative dataset for the head: the backbone's embeddings of each window.
+    def generate():
+        for emb in embeddings:
+            yield [emb[np.newaxis].astype(np.float32)]
+    return generate
+
+
+def _convert(model, input_shape, representative=None):
+    import tensorflow as tf
+
+    fn = tf.function(lambda x: model(x, training=False))
+    concrete = fn.get_concrete_function(tf.TensorSpec(input_shape, tf.float32))
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+
+    if representative is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative
+    return converter.convert()
+
+
+def export(model_path=MODEL_PATH, int8=False, calibration_videos=()):
+    detector = KerasDetector(model_path)
+    backbone_path, head_path = tflite_paths(model_path, int8)
+
+    backbone_rep = head_rep = None
+    if int8:
+        if not calibration_videos:
+            raise ValueError("--int8 needs --calibration videos")
+        print("Sampling calibration footage...")
+        windows = list(sample_windows(calibration_videos, detector.sequence_length,
+                                      detector.img_size, CALIBRATION_WINDOWS_PER_VIDEO))
+        if not windows:
+            raise ValueError("No calibration windows could be read from the given videos")
+        embeddings = [detector.embed(w) for w in windows]
+        print(f"Calibrating on {len(windows)} windows")
+        backbone_rep = backbone_dataset(windows)
+        head_rep = head_dataset(embeddings)
+
+    print("Converting backbone...")
+    backbone_tflite = _convert(detector.backbone, (1, detector.img_size, detector.img_size, 3), backbone_rep)
+    with open(backbone_path, 'wb') as f:
+        f.write(backbone_tflite)
+    print(f"Saved {backbone_path} ({len(backbone_tflite) / 1e6:.1f} MB)")
+
+    print("Converting sequence head...")
+    head_tflite = _convert(detector.head, (1, detector.sequence_length, detector.embedding_dim), head_rep)
+    with open(head_path, 'wb') as f:
+        f.write(head_tflite)
+    print(f"Saved {head_path} ({len(head_tflite) / 1e6:.1f} MB)")
+
+
+def _measure(backend, int8, model_path, windows, result_queue):
+    # Runs in a fresh process so ru_maxrss reflects this backend alone.
+    runtime = load_runtime(model_path, backend=backend, int8=int8)
+    probs = []
+    frame_ms = []
+    for window in windows:
+        embeddings = []
+        for frame in window:
+            t0 = time.perf_counter()
+            embeddings.append(runtime.embed(frame[np.newaxis])[0])
+            frame_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        probs.append(float(runtime.score(np.stack(embeddings)[np.newaxis])[0]))
+        frame_ms[-1] += (time.perf_counter() - t0) * 1000
+
+    result_queue.put({
+        "probs": probs,
+        "frame_ms_p50": float(np.percentile(frame_ms, 50)),
+        "frame_ms_p95": float(np.percentile(frame_ms, 95)),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def compare(video_paths, model_path=MODEL_PATH, report_path="tflite_report.json"):
+    geometry = load_geometry(model_path)
+    windows = list(sample_windows(video_paths, geometry["sequence_length"], geometry["img_size"],
+                                  COMPARE_WINDOWS_PER_VIDEO))
+    if not windows:
+        raise ValueError("No comparison windows could be read from the given videos")
+
+    ctx = mp.get_context("spawn")
+    variants = [("keras", False), ("tflite", False), ("tflite", True)]
+    results = {}
+    for backend, int8 in variants:
+        name = f"{backend}-int8" if int8 else backend
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(backend, int8, model_path, windows, queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0 or queue.empty():
+            print(f"Skipping {name}: worker exited with {proc.exitcode}")
+            continue
+        results[name] = queue.get()
+
+    if "keras" not in results:
+        raise RuntimeError("Keras reference run failed; nothing to compare against")
+    reference = np.array(results["keras"]["probs"])
+    print("\n========= TFLITE COMPARISON =========")
+    print(f"{'variant':<14}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>10}{'max |dp|':>10}{'agree':>8}")
+    for name, r in results.items():
+        probs = np.array(r["probs"])
+        r["max_abs_diff"] = float(np.max(np.abs(probs - reference)))
+        r["threshold_agreement"] = float(np.mean((probs > CONFIDENCE_THRESHOLD) == (reference > CONFIDENCE_THRESHOLD)))
+        print(f"{name:<14}{r['frame_ms_p50']:>10.2f}{r['frame_ms_p95']:>10.2f}{r['max_rss_mb']:>10.1f}"
+              f"{r['max_abs_diff']:>10.4f}{r['threshold_agreement']*100:>7.1f}%")
+
+    with open(report_path, "w") as f:
+        json.dump({"windows": len(windows), "results": results}, f, indent=2)
+    print(f"Saved report to: {report_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the CCTV model to TFLite.")
+    parser.add_argument("--model", default=MODEL_PATH, help="Keras weights file")
+    parser.add_argument("--int8", action="store_true", help="quantize with int8 calibration")
+    parser.add_argument("--calibration", nargs="*", default=[], help="videos to calibrate int8 ranges on")
+    parser.add_argument("--compare", nargs="*", help="videos to compare Keras vs TFLite on")
+    parser.add_argument("--report", default="tflite_report.json", help="comparison report path")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare, model_path=args.model, report_path=args.report)
+    else:
+        export(args.model, int8=args.int8, calibration_videos=args.calibration)
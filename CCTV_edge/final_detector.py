@@ -1,157 +1,206 @@
+import argparse
+import datetime
 import cv2
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras import layers, Model
 from collections import deque
+import os
+import sys
 import time
-import requests
-import base64
-import threading
-import csv
 
-MODEL_PATH = 'accident_video_model.h5'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'servers', 'shared'))
+
+from camera_registry import CameraRegistry
+from detector_model import MODEL_PATH, load_runtime, preprocess_frame
+from alert_dispatcher import AlertDispatcher
+from frame_sampler import FrameSampler, MODEL_FPS
+from clip_recorder import ClipRecorder, PRE_EVENT_SECONDS, POST_EVENT_SECONDS
+from edge_metrics import EdgeMetrics, CsvLogWriter, serve_metrics, METRICS_PORT, HISTOGRAM_WINDOW
+
 VIDEO_SOURCE = 'accident_video.mp4'
 
-SEQUENCE_LENGTH = 50
-IMG_SIZE = 256
 CONFIDENCE_THRESHOLD = 0.90
 
+CAMERA_ID = "CCTV-01"
+CAMERA_LOCATION = "Main Highway"
+
 ALERT_SERVER_URL = "http://127.0.0.1:5001/alert"
 ALERT_COOLDOWN = 300
-last_alert_time = 0
-
-latency_log = []
-frame_times = []
-start_overall = time.time()
-total_frames = 0
-
 
 CSV_FILE = "metrics.csv"
-with open(CSV_FILE, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["frame_number", "inference_ms", "fps"])
-
-
-def MobileNetV2_LSTM(input_shape=(SEQUENCE_LENGTH, IMG_SIZE, IMG_SIZE, 3), num_classes=1):
-    inputs = tf.keras.Input(shape=input_shape)
-    cnn_base = tf.keras.applications.MobileNetV2(
-        input_shape=(IMG_SIZE, IMG_SIZE, 3),
-        include_top=False,
-        weights=None
-    )
-    cnn_base.trainable = False
-
-    x = layers.TimeDistributed(cnn_base)(inputs)
-    x = layers.TimeDistributed(layers.GlobalAveragePooling2D())(x)
-    x = layers.LSTM(64, dropout=0.3)(x)
-    x = layers.Dense(32, activation='relu')(x)
-    x = layers.Dropout(0.5)(x)
-    outputs = layers.Dense(num_classes, activation='sigmoid')(x)
-
-    return Model(inputs, outputs)
-
-
-print("Building model...")
-model = MobileNetV2_LSTM()
-model.compile(optimizer='adam', loss="binary_crossentropy")
-
-print("Loading weights...")
-model.load_weights(MODEL_PATH)
-print("Model loaded successfully!")
-
-
-def send_alert_async(frame, confidence):
-    try:
-        _, buffer = cv2.imencode('.jpg', frame)
-        jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-
-        payload = {
-            "camera_id": "CCTV-01",
-            "location": "Main Highway",
-            "confidence": f"{confidence*100:.1f}",
-            "image": jpg_as_text
-        }
-        requests.post(ALERT_SERVER_URL, json=payload)
-        print("\n>> Alert sent!")
-    except:
-        pass
-
-
-cap = cv2.VideoCapture(VIDEO_SOURCE)
-width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-frame_queue = deque(maxlen=SEQUENCE_LENGTH)
-
-print("Starting detection... (press 'q' to exit)")
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    total_frames += 1
-    frame_times.append(time.time())
-
-    frame_times = [t for t in frame_times if time.time() - t <= 1]
-    current_fps = len(frame_times)
-
-    resized = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
-    rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB) / 255.0
-    frame_queue.append(rgb)
-
-    label = "Buffering..."
-    color = (0, 255, 255)
-    inference_ms = 0
-    prob = 0
-
-    if len(frame_queue) == SEQUENCE_LENGTH:
-        seq = np.expand_dims(np.array(frame_queue), axis=0)
+MAX_READ_FAILURES = 50
+
+
+def camera_settings(registry, camera_id):
+    # Per-camera threshold and cooldown from the registry, falling back to the
+    # module defaults. Cheap enough to call per frame; edits apply on the fly.
+    camera = registry.get(camera_id) if registry else None
+    if camera is None:
+        return CONFIDENCE_THRESHOLD, ALERT_COOLDOWN
+    threshold = camera.threshold if camera.threshold is not None else CONFIDENCE_THRESHOLD
+    cooldown = camera.cooldown if camera.cooldown is not None else ALERT_COOLDOWN
+    return threshold, cooldown
+
+
+def run_live(video_source=VIDEO_SOURCE, model_path=MODEL_PATH, backend='keras', int8=False,
+             metrics_port=METRICS_PORT, model_fps=MODEL_FPS, record_clips=True,
+             pre_seconds=PRE_EVENT_SECONDS, post_seconds=POST_EVENT_SECONDS,
+             camera_id=CAMERA_ID, registry_path=None):
+    registry = CameraRegistry(registry_path) if registry_path else None
+    camera = registry.get(camera_id) if registry else None
+    if registry and camera is None:
+        print(f"Camera {camera_id} is not in {registry_path}; using default threshold and cooldown")
+    location = (camera.name or camera.site or CAMERA_LOCATION) if camera else CAMERA_LOCATION
+
+    print(f"Loading {backend} model...")
+    runtime = load_runtime(model_path, backend=backend, int8=int8)
+    print(f"Model loaded successfully! (T={runtime.sequence_length}, {runtime.img_size}px input)")
+
+    last_alert_time = 0
+    metrics = EdgeMetrics()
+    log_writer = CsvLogWriter(CSV_FILE, ["frame_number", "inference_ms", "fps"])
+    metrics_server = serve_metrics(metrics, port=metrics_port) if metrics_port else None
+    dispatcher = AlertDispatcher(ALERT_SERVER_URL, camera_id, location)
+    recorder = ClipRecorder(pre_seconds=pre_seconds, post_seconds=post_seconds) if record_clips else None
+
+    cap = cv2.VideoCapture(video_source)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    embedding_queue = deque(maxlen=runtime.sequence_length)
+    is_stream = not os.path.isfile(str(video_source))
+    sampler = FrameSampler(cap, model_fps, live=is_stream)
+    last_source_time = None
+    read_failures = 0
+    stalled = False
+
+    print("Starting detection... (press 'q' to exit)")
+
+    while cap.isOpened():
+        sample = sampler.read()
+        if sample is None:
+            if not is_stream:
+                break
+            metrics.dropped_frames += 1
+            read_failures += 1
+            stalled = True
+            if read_failures > MAX_READ_FAILURES:
+                print("Camera stopped delivering frames.")
+                break
+            continue
+        read_failures = 0
+        frame_number, timestamp, frame = sample
+
+        if stalled or sampler.is_gap(last_source_time, sampler.source_time):
+            # Don't stitch footage from both sides of a stall into one window.
+            if embedding_queue:
+                metrics.window_resets += 1
+                print(f"Gap in the video source at frame {frame_number}, "
+                      f"restarting the window ({metrics.window_resets} resets)")
+            embedding_queue.clear()
+        stalled = False
+        last_source_time = sampler.source_time
+
+        metrics.frame()
+        metrics.skipped_frames = sampler.skipped
+        if recorder:
+            recorder.add(frame)
+        current_fps = int(metrics.fps.rate())
+        metrics.queue_depth = log_writer.backlog()
+
+        label = "Buffering..."
+        color = (0, 255, 255)
+        inference_ms = 0
+        prob = 0
 
         t0 = time.time()
-        pred = model.predict(seq, verbose=0)[0][0]
-        t1 = time.time()
-
-        inference_ms = (t1 - t0) * 1000
-        latency_log.append(inference_ms)
-        prob = pred
-
-        with open(CSV_FILE, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([total_frames, inference_ms, current_fps])
-
-        if prob > CONFIDENCE_THRESHOLD:
-            label = f"ACCIDENT! ({prob*100:.1f}%)"
-            color = (0, 0, 255)
-
-            now = time.time()
-            if now - last_alert_time > ALERT_COOLDOWN:
-                threading.Thread(target=send_alert_async, args=(frame.copy(), prob)).start()
-                last_alert_time = now
-        else:
-            label = f"Normal ({prob*100:.1f}%)"
-            color = (0, 255, 0)
-
-    cv2.rectangle(frame, (0, 0), (width, 60), (0, 0, 0), -1)
-    cv2.putText(frame, label, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-    cv2.putText(frame, f"Inference: {inference_ms:.1f}ms | FPS: {current_fps}", 
-                (20, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-
-    cv2.imshow("Real-Time Accident Detector", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-
-print("\n========= METRICS SUMMARY =========")
-if latency_log:
-    print(f"Frames processed: {total_frames}")
-    print(f"Average FPS: {total_frames / (time.time() - start_overall):.2f}")
-    print(f"Average Inference Latency: {np.mean(latency_log):.2f} ms")
-    print(f"Min Latency: {np.min(latency_log):.2f} ms")
-    print(f"Max Latency: {np.max(latency_log):.2f} ms")
-    print(f"P95 Latency: {np.percentile(latency_log, 95):.2f} ms")
-    print(f"Saved CSV to: {CSV_FILE}")
-else:
-    print("No inference metrics collected.")
+        embedding_queue.append(runtime.embed(preprocess_frame(frame, runtime.img_size)[np.newaxis])[0])
+
+        if len(embedding_queue) == runtime.sequence_length:
+            pred = runtime.score(np.stack(embedding_queue)[np.newaxis])[0]
+            t1 = time.time()
+
+            inference_ms = (t1 - t0) * 1000
+            metrics.inference(inference_ms)
+            prob = pred
+
+            log_writer.log([frame_number, inference_ms, current_fps])
+
+            threshold, cooldown = camera_settings(registry, camera_id)
+            if prob > threshold:
+                label = f"ACCIDENT! ({prob*100:.1f}%)"
+                color = (0, 0, 255)
+
+                now = time.time()
+                if now - last_alert_time > cooldown:
+                    if recorder:
+                        # The alert goes out once the post-event clip is encoded.
+                        snapshot = frame.copy()
+                        occurred_at = datetime.datetime.utcnow().isoformat()
+                        recorder.trigger(lambda path, snapshot=snapshot, prob=prob, occurred_at=occurred_at:
+                                         dispatcher.submit(snapshot, prob, occurred_at, clip_path=path))
+                    else:
+                        dispatcher.submit(frame, prob)
+                    last_alert_time = now
+                    metrics.alerts += 1
+            else:
+                label = f"Normal ({prob*100:.1f}%)"
+                color = (0, 255, 0)
+
+        cv2.rectangle(frame, (0, 0), (width, 60), (0, 0, 0), -1)
+        cv2.putText(frame, label, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        cv2.putText(frame, f"Inference: {inference_ms:.1f}ms | FPS: {current_fps}", 
+                    (20, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+        cv2.imshow("Real-Time Accident Detector", frame)
+
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    log_writer.close()
+    if recorder:
+        recorder.close()
+    dispatcher.close()
+    if metrics_server:
+        metrics_server.shutdown()
+
+    print("\n========= METRICS SUMMARY =========")
+    if metrics.inferences:
+        summary = metrics.snapshot()
+        latency = summary["latency_ms"]
+        print(f"Frames processed: {metrics.frames} (skipped without decoding: {sampler.skipped})")
+        print(f"Average FPS: {summary['avg_fps']:.2f}")
+        print(f"Average Inference Latency: {latency['mean']:.2f} ms")
+        print(f"Min Latency: {latency['min']:.2f} ms")
+        print(f"Max Latency: {latency['max']:.2f} ms")
+        print(f"P95 Latency: {latency['p95']:.2f} ms (last {min(latency['count'], HISTOGRAM_WINDOW)} inferences)")
+        print(f"P99 Latency: {latency['p99']:.2f} ms")
+        print(f"Dropped frames: {metrics.dropped_frames}")
+        print(f"Window resets: {metrics.window_resets}")
+        print(f"Saved CSV to: {CSV_FILE}")
+    else:
+        print("No inference metrics collected.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Real-time CCTV accident detector.")
+    parser.add_argument("--source", default=VIDEO_SOURCE, help="video file or camera URL")
+    parser.add_argument("--model", default=MODEL_PATH, help="Keras weights file")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="inference runtime")
+    parser.add_argument("--int8", action="store_true", help="use the int8 TFLite export")
+    parser.add_argument("--model-fps", type=float, default=MODEL_FPS,
+                        help="frames per second fed to the model (0 = every frame)")
+    parser.add_argument("--no-clips", action="store_true", help="send snapshots only, without event clips")
+    parser.add_argument("--clip-pre", type=float, default=PRE_EVENT_SECONDS, help="seconds kept before an alert")
+    parser.add_argument("--clip-post", type=float, default=POST_EVENT_SECONDS, help="seconds recorded after an alert")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="local HTTP metrics port (0 disables it)")
+    parser.add_argument("--camera-id", default=CAMERA_ID, help="ID this camera reports under")
+    parser.add_argument("--registry", default=None,
+                        help="camera registry JSON with per-camera threshold and cooldown")
+    args = parser.parse_args()
+
+    run_live(args.source, model_path=args.model, backend=args.backend, int8=args.int8,
+             metrics_port=args.metrics_port, model_fps=args.model_fps, record_clips=not args.no_clips,
+             pre_seconds=args.clip_pre, post_seconds=args.clip_post,
+             camera_id=args.camera_id, registry_path=args.registry)
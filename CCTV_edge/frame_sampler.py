@@ -0,0 +1,70 @@
+import time
+
+import cv2
+
+MODEL_FPS = 10
+MAX_GAP_INTERVALS = 3
+MIN_GAP_SECONDS = 1.0
+
+
+class FrameSampler:
+    # Pulls frames from a VideoCapture at roughly target_fps. Frames that are
+    # not needed are only grab()bed, never retrieve()d, so they skip the
+    # decode into a BGR image as well as the resize. Files are timed by their
+    # frame index and native fps; live streams by wall-clock arrival. Gaps are
+    # judged on source time (the stream's own position, when it reports one),
+    # so a detector that is merely slow does not look like missing footage.
+
+    def __init__(self, cap, target_fps=MODEL_FPS, live=False):
+        self.cap = cap
+        self.source_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.live = live or not self.source_fps
+        self.interval = 1.0 / target_fps if target_fps else 0.0
+        self.frame_index = 0
+        self.skipped = 0
+        self.source_time = None
+        self._next_due = None
+
+    def _timestamp(self):
+        if self.live:
+            return time.time()
+        return (self.frame_index - 1) / self.source_fps
+
+    def _source_time(self, timestamp):
+        if not self.live:
+            return timestamp
+        position_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        return position_ms / 1000.0 if position_ms and position_ms > 0 else None
+
+    def read(self):
+        # Returns (frame_index, timestamp, frame), or None when the source
+        # fails to deliver a frame.
+        while True:
+            if not self.cap.grab():
+                return None
+            self.frame_index += 1
+            timestamp = self._timestamp()
+
+            if self._next_due is not None and timestamp < self._next_due - 1e-6:
+                self.skipped += 1
+                continue
+
+            ok, frame = self.cap.retrieve()
+            if not ok:
+                return None
+            self.source_time = self._source_time(timestamp)
+            if self._next_due is None or timestamp - self._next_due > self.interval:
+                # First frame, or we fell behind: re-anchor instead of bursting.
+                self._next_due = timestamp + self.interval
+            else:
+                self._next_due += self.interval
+            return self.frame_index, timestamp, frame
+
+    def is_gap(self, previous, current):
+        # True when two kept frames are too far apart in source time to belong
+        # to one window. Either time may be None (a stream without positions),
+        # in which case only read failures mark a gap.
+        if previous is None or current is None:
+            return False
+        expected = self.interval or (1.0 / self.source_fps if self.source_fps else 0.0)
+        return current - previous > max(MAX_GAP_INTERVALS * expected, MIN_GAP_SECONDS)
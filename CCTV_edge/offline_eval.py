@@ -0,0 +1,176 @@
+"""
+Headless, max-speed scoring of recorded footage for threshold backtesting.
+
+    python offline_eval.py clips/*.mp4 --out scores.npz --workers 4
+
+Writes one compressed .npz with flat arrays:
+    videos       - source paths, indexed by `video_index`
+    fps          - native frame rate of each video
+    video_index  - which video each window belongs to
+    frame        - 1-based source frame number at the end of the window
+                   (same numbering as `frame_number` in metrics.csv)
+    time         - timestamp of that frame in seconds
+    prob         - accident probability for that window
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from detector_model import MODEL_PATH, load_runtime, preprocess_frame
+from frame_sampler import FrameSampler, MODEL_FPS
+
+FRAME_BATCH = 32
+WINDOW_BATCH = 64
+
+_worker_runtime = None
+
+
+def _init_worker(model_path, backend, int8, threads):
+    global _worker_runtime
+    if threads and backend == 'keras':
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    _worker_runtime = load_runtime(model_path, backend=backend, int8=int8)
+
+
+def score_video(path, runtime, stride=1, model_fps=MODEL_FPS,
+                frame_batch=FRAME_BATCH, window_batch=WINDOW_BATCH):
+    cap = cv2.VideoCapture(path)
+    sampler = FrameSampler(cap, model_fps)
+    fps = sampler.source_fps
+
+    sequence_length = runtime.sequence_length
+    embeddings = deque(maxlen=sequence_length)
+    pending_frames = []
+    pending_meta = []
+    pending_windows = []
+    pending_ends = []
+    frames_out = []
+    times_out = []
+    probs_out = []
+    samples = 0
+    last_timestamp = None
+
+    def flush_windows():
+        if not pending_windows:
+            return
+        preds = runtime.score(np.stack(pending_windows))
+        frames_out.extend(end for end, _ in pending_ends)
+        times_out.extend(t for _, t in pending_ends)
+        probs_out.extend(preds.tolist())
+        pending_windows.clear()
+        pending_ends.clear()
+
+    def flush_frames():
+        nonlocal samples
+        if not pending_frames:
+            return
+        batch = runtime.embed(np.stack(pending_frames))
+        for emb, (frame_number, timestamp, gap) in zip(batch, pending_meta):
+            if gap:
+                embeddings.clear()
+            embeddings.append(emb)
+            samples += 1
+            if len(embeddings) == sequence_length and (samples - sequence_length) % stride == 0:
+                pending_windows.append(np.stack(embeddings))
+                pending_ends.append((frame_number, timestamp))
+                if len(pending_windows) >= window_batch:
+                    flush_windows()
+        pending_frames.clear()
+        pending_meta.clear()
+
+    while True:
+        sample = sampler.read()
+        if sample is None:
+            break
+        frame_number, timestamp, frame = sample
+        gap = last_timestamp is not None and sampler.is_gap(last_timestamp, timestamp)
+        last_timestamp = timestamp
+        pending_frames.append(preprocess_frame(frame, runtime.img_size))
+        pending_meta.append((frame_number, timestamp, gap))
+        if len(pending_frames) >= frame_batch:
+            flush_frames()
+
+    flush_frames()
+    flush_windows()
+    cap.release()
+
+    return (np.asarray(frames_out, dtype=np.int32),
+            np.asarray(times_out, dtype=np.float32),
+            np.asarray(probs_out, dtype=np.float32),
+            float(fps),
+            sampler.frame_index)
+
+
+def _score_in_worker(args):
+    path, stride, model_fps = args
+    t0 = time.time()
+    frames, times, probs, fps, total = score_video(path, _worker_runtime, stride=stride, model_fps=model_fps)
+    return path, frames, times, probs, fps, total, time.time() - t0
+
+
+def evaluate(paths, out_path, model_path=MODEL_PATH, backend='keras', int8=False, workers=1, stride=1,
+             model_fps=MODEL_FPS):
+    jobs = [(p, stride, model_fps) for p in paths]
+    results = []
+
+    if workers > 1:
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(model_path, backend, int8, threads)) as pool:
+            for result in pool.imap(_score_in_worker, jobs):
+                results.append(result)
+                _report(result)
+    else:
+        _init_worker(model_path, backend, int8, None)
+        for job in jobs:
+            result = _score_in_worker(job)
+            results.append(result)
+            _report(result)
+
+    video_index = np.concatenate(
+        [np.full(len(r[1]), i, dtype=np.int32) for i, r in enumerate(results)]
+    ) if results else np.zeros(0, dtype=np.int32)
+
+    np.savez_compressed(
+        out_path,
+        videos=np.array([r[0] for r in results]),
+        fps=np.array([r[4] for r in results], dtype=np.float32),
+        video_index=video_index,
+        frame=np.concatenate([r[1] for r in results]) if results else np.zeros(0, dtype=np.int32),
+        time=np.concatenate([r[2] for r in results]) if results else np.zeros(0, dtype=np.float32),
+        prob=np.concatenate([r[3] for r in results]) if results else np.zeros(0, dtype=np.float32),
+    )
+    print(f"Saved {len(video_index)} window scores from {len(results)} videos to: {out_path}")
+
+
+def _report(result):
+    path, frames, times, probs, fps, total, elapsed = result
+    speed = total / elapsed if elapsed > 0 else 0.0
+    peak = probs.max() if len(probs) else 0.0
+    print(f"{path}: {total} frames, {len(probs)} windows, peak {peak*100:.1f}% "
+          f"({speed:.1f} frames/s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score recorded videos without a display.")
+    parser.add_argument("videos", nargs="+", help="video files to score")
+    parser.add_argument("--out", default="scores.npz", help="output .npz file")
+    parser.add_argument("--model", default=MODEL_PATH, help="weights file")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="inference runtime")
+    parser.add_argument("--int8", action="store_true", help="use the int8 TFLite export")
+    parser.add_argument("--workers", type=int, default=1, help="process pool size (one video per worker)")
+    parser.add_argument("--stride", type=int, default=1,
+                        help="score every Nth window (1 = every sampled frame, like the live detector)")
+    parser.add_argument("--model-fps", type=float, default=MODEL_FPS,
+                        help="frames per second fed to the model (0 = every frame)")
+    args = parser.parse_args()
+
+    evaluate(args.videos, args.out, model_path=args.model, backend=args.backend, int8=args.int8,
+             workers=args.workers, stride=args.stride, model_fps=args.model_fps)
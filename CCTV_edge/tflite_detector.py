@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+from detector_model import MODEL_PATH
+
+
+def tflite_paths(model_path=MODEL_PATH, int8=False):
+    stem = os.path.splitext(model_path)[0]
+    suffix = "_int8" if int8 else ""
+    return f"{stem}_backbone{suffix}.tflite", f"{stem}_head{suffix}.tflite"
+
+
+def _load_interpreter(path, threads=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found. Run 'python export_tflite.py' first.")
+    interpreter = Interpreter(model_path=path, num_threads=threads)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+class TFLiteDetector:
+    backend = 'tflite'
+
+    def __init__(self, model_path=MODEL_PATH, int8=False, threads=None):
+        backbone_path, head_path = tflite_paths(model_path, int8)
+        self.backbone = _load_interpreter(backbone_path, threads)
+        self.head = _load_interpreter(head_path, threads)
+
+        self._backbone_in = self.backbone.get_input_details()[0]['index']
+        self._backbone_out = self.backbone.get_output_details()[0]['index']
+        self._head_in = self.head.get_input_details()[0]['index']
+        self._head_out = self.head.get_output_details()[0]['index']
+
+        _, self.img_size, _, _ = self.backbone.get_input_details()[0]['shape']
+        _, self.sequence_length, self.embedding_dim = self.head.get_input_details()[0]['shape']
+
+    def embed(self, frames):
+        out = np.empty((len(frames), self.embedding_dim), dtype=np.float32)
+        for i, frame in enumerate(frames):
+            self.backbone.set_tensor(self._backbone_in, frame[np.newaxis].astype(np.float32, copy=False))
+            self.backbone.invoke()
+            out[i] = self.backbone.get_tensor(self._backbone_out)[0]
+        return out
+
+    def score(self, windows):
+        out = np.empty(len(windows), dtype=np.float32)
+        for i, window in enumerate(windows):
+            self.head.set_tensor(self._head_in, window[np.newaxis].astype(np.float32, copy=False))
+            self.head.invoke()
+            out[i] = self.head.get_tensor(self._head_out)[0][0]
+        return out
+
+    def warmup(self):
+        self.embed(np.zeros((1, self.img_size, self.img_size, 3), dtype=np.float32))
+        self.score(np.zeros((1, self.sequence_length, self.embedding_dim), dtype=np.float32))
@@ -0,0 +1,163 @@
+"""
+Frozen-backbone embedding cache for training the CCTV sequence head.
+
+    python embedding_store.py /content/processed_frames/metadata.csv --store embedding_store
+
+Runs the ImageNet MobileNetV2 backbone once over every cached clip listed in
+metadata.csv (npy_path,label, as written by preprocess.py or the notebook) and stores the pooled
+per-frame embeddings as one float16 memory-mapped array of shape
+(clips, SEQUENCE_LENGTH, embedding_dim). Re-running only embeds clips whose source
+file is new or changed (size, mtime) or whose backbone config differs.
+"""
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CCTV_edge'))
+
+from detector_model import ALPHA, SEQUENCE_LENGTH, MobileNetV2_LSTM, split_model, traced_call
+
+STORE_DIR = "embedding_store"
+TRAIN_IMG_SIZE = 224
+EMBED_BATCH = 64
+INDEX_SAVE_EVERY = 50
+
+INDEX_COLUMNS = ["key", "row", "label", "size", "mtime_ns", "config"]
+
+
+def backbone_config(img_size=TRAIN_IMG_SIZE, alpha=ALPHA):
+    return f"mobilenetv2-imagenet-{img_size}-a{alpha}"
+
+
+def make_embedder(img_size=TRAIN_IMG_SIZE, sequence_length=SEQUENCE_LENGTH, batch_size=EMBED_BATCH, alpha=ALPHA):
+    model = MobileNetV2_LSTM(input_shape=(sequence_length, img_size, img_size, 3), backbone_weights='imagenet',
+                             alpha=alpha)
+    backbone, _ = split_model(model)
+    call = traced_call(backbone, (img_size, img_size, 3))
+
+    def embed(frames):
+        if frames.shape[1:3] != (img_size, img_size):
+            frames = np.stack([cv2.resize(f, (img_size, img_size)) for f in frames])
+        x = frames.astype(np.float32) / 255.0
+        return np.concatenate([call(x[i:i + batch_size]).numpy() for i in range(0, len(x), batch_size)])
+
+    return embed, backbone.output_shape[-1]
+
+
+class EmbeddingStore:
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, "index.csv")
+        self.data_path = os.path.join(store_dir, "embeddings.npy")
+        self.meta_path = os.path.join(store_dir, "store.json")
+
+        os.makedirs(store_dir, exist_ok=True)
+        self.meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        if os.path.exists(self.index_path):
+            self.index = pd.read_csv(self.index_path)
+        else:
+            self.index = pd.DataFrame(columns=INDEX_COLUMNS)
+        self.data = np.load(self.data_path, mmap_mode='r+') if os.path.exists(self.data_path) else None
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        self.index.to_csv(tmp, index=False)
+        os.replace(tmp, self.index_path)
+        with open(self.meta_path, "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def _ensure_capacity(self, rows, sequence_length, embedding_dim):
+        current = 0 if self.data is None else len(self.data)
+        if self.data is not None and self.data.shape[1:] != (sequence_length, embedding_dim):
+            raise ValueError(f"Store holds {self.data.shape[1:]} embeddings, "
+                             f"cannot add {(sequence_length, embedding_dim)}; use a new --store")
+        if rows <= current:
+            return
+        capacity = max(rows, current * 2, 64)
+        tmp = self.data_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float16,
+                                          shape=(capacity, sequence_length, embedding_dim))
+        if current:
+            grown[:current] = self.data
+        grown.flush()
+        del grown
+        self.data = None
+        os.replace(tmp, self.data_path)
+        self.data = np.load(self.data_path, mmap_mode='r+')
+
+    def update(self, metadata_csv, img_size=TRAIN_IMG_SIZE, alpha=ALPHA):
+        config = backbone_config(img_size, alpha)
+        clips = pd.read_csv(metadata_csv)
+        existing = {row.key: row for row in self.index.itertuples(index=False)}
+        wanted = set(clips["npy_path"])
+
+        # Rows of clips that disappeared from metadata.csv are reused.
+        free_rows = sorted(int(r.row) for k, r in existing.items() if k not in wanted)
+        next_row = int(self.index["row"].max()) + 1 if len(self.index) else 0
+
+        entries, todo = [], []
+        for clip in clips.itertuples(index=False):
+            stat = os.stat(clip.npy_path)
+            old = existing.get(clip.npy_path)
+            if old is not None:
+                row = int(old.row)
+                fresh = (int(old.size) == stat.st_size and int(old.mtime_ns) == stat.st_mtime_ns
+                         and old.config == config)
+            else:
+                row = free_rows.pop(0) if free_rows else next_row
+                next_row = max(next_row, row + 1)
+                fresh = False
+            entry = {"key": clip.npy_path, "row": row, "label": int(clip.label),
+                     "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "config": config}
+            if fresh:
+                entries.append(entry)
+            else:
+                todo.append(entry)
+
+        print(f"[INFO] {len(entries)} clips cached, {len(todo)} to embed")
+        self.index = pd.DataFrame(entries, columns=INDEX_COLUMNS)
+        if not todo:
+            self._save_index()
+            return 0
+
+        embed, embedding_dim = make_embedder(img_size, alpha=alpha)
+        self.meta.update({"img_size": img_size, "sequence_length": SEQUENCE_LENGTH, "alpha": alpha,
+                          "embedding_dim": embedding_dim, "config": config})
+        self._ensure_capacity(next_row, SEQUENCE_LENGTH, embedding_dim)
+
+        done = []
+        for i, entry in enumerate(todo, 1):
+            frames = np.load(entry["key"])[:SEQUENCE_LENGTH]
+            if len(frames) < SEQUENCE_LENGTH:
+                # Same black-frame padding the notebook applies to short clips.
+                padding = np.zeros((SEQUENCE_LENGTH - len(frames),) + frames.shape[1:], dtype=frames.dtype)
+                frames = np.concatenate([frames, padding])
+            self.data[entry["row"]] = embed(frames).astype(np.float16)
+            done.append(entry)
+            if i % INDEX_SAVE_EVERY == 0 or i == len(todo):
+                # Index rows are only written after their embeddings, so an
+                # interrupted run resumes where it stopped.
+                self.data.flush()
+                self.index = pd.DataFrame(entries + done, columns=INDEX_COLUMNS)
+                self._save_index()
+                print(f"[INFO] Embedded {i}/{len(todo)} clips")
+        return len(todo)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or refresh the backbone embedding store.")
+    parser.add_argument("metadata", help="metadata.csv with npy_path,label columns")
+    parser.add_argument("--store", default=STORE_DIR, help="embedding store directory")
+    parser.add_argument("--img-size", type=int, default=TRAIN_IMG_SIZE, help="backbone input size")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="MobileNetV2 width multiplier")
+    args = parser.parse_args()
+
+    EmbeddingStore(args.store).update(args.metadata, img_size=args.img_size, alpha=args.alpha)
@@ -0,0 +1,161 @@
+"""
+Parallel, resumable video-to-frame cache for CCTV training.
+
+    python preprocess.py /content/hwid12_data --cache /content/processed_frames --workers 8
+
+Replaces the notebook's preprocessing cell. Every .mp4/.avi under the dataset
+root is sampled at SEQUENCE_LENGTH np.linspace positions (as in the notebook),
+resized, converted to RGB and stored as a uint8 (SEQUENCE_LENGTH, H, W, 3)
+.npy. Cache files are named by a hash of the source path, size, mtime and
+preprocessing config and sharded into 256 subdirectories, so re-running only
+processes new or changed clips. metadata.csv keeps the notebook's
+npy_path,label columns and is read by embedding_store.py.
+"""
+import argparse
+import glob
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+import pandas as pd
+
+SEQUENCE_LENGTH = 50
+IMG_HEIGHT = 224
+IMG_WIDTH = 224
+CACHE_DIR = "processed_frames"
+VIDEO_PATTERNS = ("*.mp4", "*.avi")
+SEEK_MIN_GAP = 120
+
+
+def label_for(video_path):
+    folder_name = os.path.basename(os.path.dirname(video_path)).lower()
+    return 0 if "negative" in folder_name or "normal" in folder_name else 1
+
+
+def cache_key(video_path, sequence_length, height, width):
+    stat = os.stat(video_path)
+    raw = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}|{sequence_length}x{height}x{width}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.npy")
+
+
+def sample_indices(total_frames, sequence_length):
+    if total_frames <= sequence_length:
+        return np.arange(total_frames)
+    return np.linspace(0, total_frames - 1, sequence_length).astype(int)
+
+
+def read_sampled_frames(video_path, sequence_length, height, width):
+    cap = cv2.VideoCapture(video_path)
+    indices = sample_indices(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), sequence_length)
+
+    frames = []
+    position = 0
+    for target in indices:
+        if target - position > SEEK_MIN_GAP:
+            # Long gaps: seek near the target, then grab the rest exactly.
+            before = position
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(target))
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            if position > target:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, before)
+                position = before
+        while position < target:
+            if not cap.grab():
+                break
+            position += 1
+        if position != target:
+            break
+        ret, frame = cap.read()
+        if not ret:
+            break
+        position += 1
+        frame = cv2.resize(frame, (width, height))
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+
+    frames = np.array(frames, dtype=np.uint8).reshape(-1, height, width, 3)
+    if len(frames) < sequence_length:
+        padding = np.zeros((sequence_length - len(frames), height, width, 3), dtype=np.uint8)
+        frames = np.concatenate([frames, padding], axis=0)
+    return frames[:sequence_length]
+
+
+def process_clip(video_path, out_path, sequence_length, height, width):
+    frames = read_sampled_frames(video_path, sequence_length, height, width)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, frames)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def build_cache(dataset_root, cache_dir=CACHE_DIR, workers=None, sequence_length=SEQUENCE_LENGTH,
+                height=IMG_HEIGHT, width=IMG_WIDTH, prune=False):
+    os.makedirs(cache_dir, exist_ok=True)
+
+    print("[INFO] Scanning dataset...")
+    video_files = []
+    for pattern in VIDEO_PATTERNS:
+        video_files += glob.glob(os.path.join(dataset_root, "**", pattern), recursive=True)
+    video_files.sort()
+
+    records, todo = [], []
+    for vid_path in video_files:
+        out_path = cache_path(cache_dir, cache_key(vid_path, sequence_length, height, width))
+        records.append([out_path, label_for(vid_path), vid_path])
+        if not os.path.exists(out_path):
+            todo.append((vid_path, out_path))
+
+    print(f"[INFO] Found {len(video_files)} videos, {len(video_files) - len(todo)} already cached, "
+          f"{len(todo)} to process")
+
+    failed = set()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_clip, vid, out, sequence_length, height, width): vid
+                       for vid, out in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                vid = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[ERROR] Failed {vid}: {e}")
+                    failed.add(vid)
+                if done % 100 == 0 or done == len(futures):
+                    print(f"[INFO] Processed {done}/{len(futures)}")
+
+    records = [r for r in records if r[2] not in failed]
+    df = pd.DataFrame(records, columns=["npy_path", "label", "source"])
+    df.to_csv(os.path.join(cache_dir, "metadata.csv"), index=False)
+
+    if prune:
+        keep = set(df["npy_path"])
+        stale = [p for p in glob.glob(os.path.join(cache_dir, "*", "*.npy")) if p not in keep]
+        for path in stale:
+            os.remove(path)
+        print(f"[INFO] Pruned {len(stale)} stale cache files")
+
+    print(f"\n[SUCCESS] {len(df)} videos in cache: {cache_dir}")
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sample and cache training frames from CCTV videos.")
+    parser.add_argument("dataset_root", help="directory searched recursively for .mp4/.avi files")
+    parser.add_argument("--cache", default=CACHE_DIR, help="output cache directory")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--sequence-length", type=int, default=SEQUENCE_LENGTH)
+    parser.add_argument("--height", type=int, default=IMG_HEIGHT)
+    parser.add_argument("--width", type=int, default=IMG_WIDTH)
+    parser.add_argument("--prune", action="store_true", help="delete cache files no longer referenced")
+    args = parser.parse_args()
+
+    build_cache(args.dataset_root, args.cache, args.workers, args.sequence_length,
+                args.height, args.width, args.prune)
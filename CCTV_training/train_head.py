@@ -0,0 +1,148 @@
+"""
+Train the CCTV LSTM head from the cached backbone embeddings.
+
+    python train_head.py --store embedding_store --out accident_video_model.h5
+
+The head is trained on float16 embeddings read straight from the memory-mapped
+store, so no frame ever goes through MobileNetV2 during training. The saved
+model is the full MobileNetV2_LSTM (ImageNet backbone + trained head), which
+final_detector.py loads as before. Its geometry (sequence length, frame size,
+width multiplier) is written next to it as a .json sidecar, which the
+detector reads to build a matching model and input pipeline.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
+from embedding_store import STORE_DIR, EmbeddingStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CCTV_edge'))
+
+from detector_model import ALPHA, MODEL_PATH, MobileNetV2_LSTM, save_geometry, split_model
+
+EPOCHS = 30
+BATCH_SIZE = 64
+LEARNING_RATE = 1e-3
+RANDOM_STATE = 42
+
+
+def split_index(index):
+    # Same stratified 80/10/10 split as the training notebook.
+    train_df, temp_df = train_test_split(index, test_size=0.2, random_state=RANDOM_STATE, stratify=index["label"])
+    val_df, test_df = train_test_split(temp_df, test_size=0.5, random_state=RANDOM_STATE, stratify=temp_df["label"])
+    return train_df, val_df, test_df
+
+
+def make_sequence(store, df, batch_size=BATCH_SIZE, shuffle=True):
+    from tensorflow import keras
+
+    class EmbeddingSequence(keras.utils.Sequence):
+        def __init__(self):
+            super().__init__()
+            self.rows = df["row"].to_numpy()
+            self.labels = df["label"].to_numpy().astype(np.float32)
+            self.order = np.arange(len(self.rows))
+            self.on_epoch_end()
+
+        def __len__(self):
+            return int(np.ceil(len(self.rows) / batch_size))
+
+        def __getitem__(self, i):
+            idx = self.order[i * batch_size:(i + 1) * batch_size]
+            # Sorted row order keeps memmap reads sequential.
+            idx = idx[np.argsort(self.rows[idx])]
+            return store.data[self.rows[idx]].astype(np.float32), self.labels[idx]
+
+        def on_epoch_end(self):
+            if shuffle:
+                np.random.shuffle(self.order)
+
+    return EmbeddingSequence()
+
+
+def train(store_dir=STORE_DIR, out_path=MODEL_PATH, epochs=EPOCHS, batch_size=BATCH_SIZE, lr=LEARNING_RATE):
+    from tensorflow import keras
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+    store = EmbeddingStore(store_dir)
+    if store.data is None or not len(store.index):
+        raise FileNotFoundError(f"Embedding store {store_dir} is empty. Run embedding_store.py first.")
+
+    img_size = store.meta["img_size"]
+    sequence_length = store.meta["sequence_length"]
+    alpha = store.meta.get("alpha", ALPHA)
+    train_df, val_df, test_df = split_index(store.index)
+    print(f"Training Samples: {len(train_df)}")
+    print(f"Validation Samples: {len(val_df)}")
+    print(f"Testing Samples: {len(test_df)}")
+
+    model = MobileNetV2_LSTM(input_shape=(sequence_length, img_size, img_size, 3), backbone_weights='imagenet',
+                             alpha=alpha)
+    _, head = split_model(model)
+    head.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=lr),
+        loss='binary_crossentropy',
+        metrics=['accuracy', keras.metrics.AUC(name='auc')]
+    )
+
+    head.fit(
+        make_sequence(store, train_df, batch_size),
+        validation_data=make_sequence(store, val_df, batch_size, shuffle=False),
+        epochs=epochs,
+        callbacks=[
+            EarlyStopping(monitor='val_loss', patience=6, restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-6, verbose=1),
+        ],
+        verbose=1
+    )
+
+    results = evaluate(head, store, test_df, batch_size)
+
+    # The head shares its layers with `model`, so this saves the trained head
+    # together with the ImageNet backbone.
+    model.save(out_path)
+    save_geometry(out_path, sequence_length, img_size, alpha)
+    print(f"\n[SUCCESS] Model saved to: {out_path} ({img_size}px, alpha={alpha})")
+    return results
+
+
+def evaluate(head, store, test_df, batch_size=BATCH_SIZE):
+    seq = make_sequence(store, test_df, batch_size, shuffle=False)
+    y_true, y_prob = [], []
+    for i in range(len(seq)):
+        x, y = seq[i]
+        y_true.append(y)
+        y_prob.append(head(x, training=False).numpy()[:, 0])
+    y_true = np.concatenate(y_true)
+    y_prob = np.concatenate(y_prob)
+    y_pred = (y_prob > 0.5).astype(int)
+
+    results = {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, zero_division=0),
+        "recall": recall_score(y_true, y_pred, zero_division=0),
+        "f1": f1_score(y_true, y_pred, zero_division=0),
+        "roc_auc": roc_auc_score(y_true, y_prob) if len(set(y_true)) > 1 else None,
+    }
+    print("\n" + "=" * 70)
+    print("MODEL EVALUATION ON TEST SET")
+    print("=" * 70)
+    for name, value in results.items():
+        print(f"{name}: {value:.4f}" if value is not None else f"{name}: undefined (one class)")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the LSTM head from cached embeddings.")
+    parser.add_argument("--store", default=STORE_DIR, help="embedding store directory")
+    parser.add_argument("--out", default=MODEL_PATH, help="output model file")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    args = parser.parse_args()
+
+    train(args.store, args.out, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr)
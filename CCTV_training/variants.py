@@ -0,0 +1,103 @@
+"""
+Train and benchmark smaller detector variants.
+
+    python variants.py /content/processed_frames/metadata.csv --out-dir variants
+
+Every (img_size, alpha) pair gets its own embedding store and a trained
+model saved as accident_video_model_{size}_a{alpha}.h5 with its geometry
+sidecar. Each model is then timed through the same embed + score path the
+edge detector uses, and the results are printed as a markdown table and
+written to variants.csv, so a site can pick its accuracy/latency point and
+deploy the matching .h5/.json pair.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import EmbeddingStore
+from train_head import train
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'CCTV_edge'))
+
+from detector_model import KerasDetector
+
+VARIANTS = [(224, 1.0), (160, 1.0), (128, 1.0), (224, 0.5), (160, 0.5), (128, 0.5)]
+BENCH_FRAMES = 200
+
+
+def variant_name(img_size, alpha):
+    return f"{img_size}_a{alpha:g}"
+
+
+def _variant(value):
+    size, alpha = value.split(":")
+    return int(size), float(alpha)
+
+
+def benchmark(model_path, frames=BENCH_FRAMES):
+    # Per-frame cost on the live path: one backbone call plus one head call.
+    detector = KerasDetector(model_path)
+    detector.warmup()
+    rng = np.random.default_rng(0)
+    frame = rng.random((1, detector.img_size, detector.img_size, 3), dtype=np.float32)
+    window = rng.random((1, detector.sequence_length, detector.embedding_dim), dtype=np.float32)
+    timings = []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        detector.embed(frame)
+        detector.score(window)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {
+        "latency_ms_p50": float(np.percentile(timings, 50)),
+        "latency_ms_p95": float(np.percentile(timings, 95)),
+        "params": detector.model.count_params(),
+    }
+
+
+def run(metadata_csv, out_dir, variants=VARIANTS, epochs=30):
+    os.makedirs(out_dir, exist_ok=True)
+    rows = []
+    for img_size, alpha in variants:
+        name = variant_name(img_size, alpha)
+        print(f"\n[INFO] Variant {name}")
+        store_dir = os.path.join(out_dir, f"embedding_store_{name}")
+        model_path = os.path.join(out_dir, f"accident_video_model_{name}.h5")
+
+        EmbeddingStore(store_dir).update(metadata_csv, img_size=img_size, alpha=alpha)
+        results = train(store_dir, model_path, epochs=epochs)
+
+        row = {"img_size": img_size, "alpha": alpha}
+        row.update(results)
+        row.update(benchmark(model_path))
+        row["size_mb"] = os.path.getsize(model_path) / (1024 * 1024)
+        row["model"] = model_path
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    csv_path = os.path.join(out_dir, "variants.csv")
+    df.to_csv(csv_path, index=False)
+
+    print("\n| img | alpha | accuracy | f1 | auc | p50 ms | p95 ms | params | MB |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    for r in df.itertuples(index=False):
+        auc = f"{r.roc_auc:.3f}" if r.roc_auc is not None and not pd.isna(r.roc_auc) else "-"
+        print(f"| {r.img_size} | {r.alpha:g} | {r.accuracy:.3f} | {r.f1:.3f} | {auc} | "
+              f"{r.latency_ms_p50:.1f} | {r.latency_ms_p95:.1f} | {r.params:,} | {r.size_mb:.1f} |")
+    print(f"\n[SUCCESS] Saved variant table to: {csv_path}")
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train and benchmark reduced-resolution / reduced-width variants.")
+    parser.add_argument("metadata", help="metadata.csv with npy_path,label columns")
+    parser.add_argument("--out-dir", default="variants", help="directory for stores, models and the table")
+    parser.add_argument("--variants", nargs="+", type=_variant, default=VARIANTS,
+                        help="img_size:alpha pairs, e.g. 160:1.0 128:0.5")
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+
+    run(args.metadata, args.out_dir, args.variants, args.epochs)
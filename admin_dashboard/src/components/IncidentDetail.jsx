@@ -392,8 +392,10 @@ export default function IncidentDetail({ incident }) {
             
             {incident.camera_id && (
               <div>
-                <p className="text-gray-500">Camera ID</p>
-                <p className="font-medium">{incident.camera_id}</p>
+                <p className="text-gray-500">{incident.camera_ids?.length > 1 ? 'Cameras' : 'Camera ID'}</p>
+                <p className="font-medium">
+                  {incident.camera_ids?.length > 1 ? incident.camera_ids.join(', ') : incident.camera_id}
+                </p>
               </div>
             )}
             
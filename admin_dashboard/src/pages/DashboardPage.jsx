@@ -11,8 +11,8 @@ export default function DashboardPage() {
   const { user } = useAuthStore()
   const { 
     fetchIncidents, 
-    addIncident, 
-    updateIncident, 
+    addIncidents, 
+    applyIncidentUpdates, 
     selectedIncident 
   } = useIncidentStore()
   
@@ -23,24 +23,25 @@ export default function DashboardPage() {
     // Connect to WebSocket
     socketService.connect()
     
-    // Listen for new incidents
-    socketService.on('new_incident', (data) => {
-      console.log('New incident received:', data)
-      addIncident(data)
+    // Listen for new incidents (batched by the server)
+    socketService.on('new_incidents', (incidents) => {
+      console.log('New incidents received:', incidents)
+      addIncidents(incidents)
       
       // Show notification
       if (Notification.permission === 'granted') {
-        new Notification('New Accident Detected', {
-          body: `${data.source} incident at ${data.lat}, ${data.lng}`,
+        const latest = incidents[incidents.length - 1]
+        new Notification(incidents.length > 1 ? `${incidents.length} New Accidents Detected` : 'New Accident Detected', {
+          body: `${latest.source} incident at ${latest.lat}, ${latest.lng}`,
           icon: '/alert-icon.png'
         })
       }
     })
     
-    // Listen for incident updates
-    socketService.on('incident_update', (data) => {
-      console.log('Incident updated:', data)
-      updateIncident(data.incident)
+    // Listen for incident updates ({id, ...changed fields})
+    socketService.on('incident_updates', (updates) => {
+      console.log('Incidents updated:', updates)
+      applyIncidentUpdates(updates)
     })
     
     // Request notification permission
@@ -52,7 +53,7 @@ export default function DashboardPage() {
     return () => {
       socketService.disconnect()
     }
-  }, [fetchIncidents, addIncident, updateIncident])
+  }, [fetchIncidents, addIncidents, applyIncidentUpdates])
   
   return (
     <div className="h-screen flex flex-col bg-gray-100">
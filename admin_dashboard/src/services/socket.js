@@ -37,6 +37,9 @@ class SocketService {
       this.listeners.forEach((callback, event) => {
         this.socket.on(event, callback)
       })
+      if (this.subscription) {
+        this.socket.emit('subscribe', this.subscription)
+      }
     })
   }
   
@@ -66,6 +69,13 @@ class SocketService {
     }
   }
   
+  // Only receive incidents matching any of these; no filters means all.
+  // cells are geohash prefixes of 3-5 characters.
+  subscribe({ cells = [], statuses = [], sources = [] } = {}) {
+    this.subscription = { cells, statuses, sources }
+    this.emit('subscribe', this.subscription)
+  }
+  
   emit(event, data) {
     if (this.socket?.connected) {
       this.socket.emit(event, data)
@@ -86,6 +86,34 @@ export const useIncidentStore = create((set, get) => ({
     }))
   },
   
+  // Add a batch of new incidents from WebSocket (newest last)
+  addIncidents: (incidents) => {
+    set(state => {
+      const known = new Set(state.incidents.map(inc => inc.id))
+      const fresh = incidents.filter(inc => !known.has(inc.id)).reverse()
+      if (fresh.length === 0) return state
+
+      return {
+        incidents: [...fresh, ...state.incidents]
+      }
+    })
+  },
+  
+  // Merge a batch of {id, ...changed fields} deltas from WebSocket
+  applyIncidentUpdates: (updates) => {
+    const byId = new Map(updates.map(update => [update.id, update]))
+    const merge = (inc) => {
+      const update = inc && byId.get(inc.id)
+      if (!update) return inc
+      const { action, ...fields } = update
+      return { ...inc, ...fields }
+    }
+    set(state => ({
+      incidents: state.incidents.map(merge),
+      selectedIncident: merge(state.selectedIncident)
+    }))
+  },
+  
   // Select incident for detail view
   selectIncident: (incident) => {
     set({ selectedIncident: incident })
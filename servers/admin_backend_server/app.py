@@ -1,8 +1,40 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
 from flask import Flask, jsonify
+from sqlalchemy import inspect
 from config import Config
-from extensions import db, login_manager, socketio, cors
+from extensions import db, login_manager, socketio, cors, response_cache, broadcaster
 from routes import register_routes
+from cooldown_store import open_cooldown_store
 import sockets
+import rollups  # registers the rollup hooks on Incident
+
+# Columns added to incidents after the first release, with their SQL types;
+# migrate.py adds them to older databases.
+ADDED_INCIDENT_COLUMNS = {
+    'geohash': 'VARCHAR(12)',
+    'camera_ids': 'TEXT',
+}
+
+
+def schema_is_current():
+    inspector = inspect(db.engine)
+    return set(ADDED_INCIDENT_COLUMNS) <= {c['name'] for c in inspector.get_columns('incidents')} \
+        and 'scope' in {c['name'] for c in inspector.get_columns('incident_rollups')}
+
+
+def socketio_queue_options(url):
+    # Emits from any worker reach clients connected to every other worker.
+    if not url:
+        return {}
+    if url.startswith('sqlite:///'):
+        from sqlite_manager import SQLiteManager
+        return {'client_manager': SQLiteManager(url[len('sqlite:///'):])}
+    return {'message_queue': url}
+
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -12,18 +44,28 @@ def create_app(config_class=Config):
     
     db.init_app(app)
     login_manager.init_app(app)
+    response_cache.init_app(app)
     cors.init_app(app, 
                   resources={r"/api/*": {"origins": config_class.CORS_ORIGINS}},
                   supports_credentials=True)
     socketio.init_app(app, 
                       cors_allowed_origins=config_class.SOCKETIO_CORS_ALLOWED_ORIGINS,
-                      manage_session=False)
+                      manage_session=False,
+                      **socketio_queue_options(app.config.get('SOCKETIO_MESSAGE_QUEUE')))
+    if app.config.get('SOCKETIO_MESSAGE_QUEUE') and not app.config.get('RESPONSE_CACHE_DB'):
+        print("⚠️ SOCKETIO_MESSAGE_QUEUE is set but RESPONSE_CACHE_DB is not; "
+              "cached incident lists will not be invalidated across workers")
+    broadcaster.init_app(app)
     
+    app.extensions['cooldowns'] = open_cooldown_store(app.config['COOLDOWN_DB'])
+
     register_routes(app)
 
     with app.app_context():
         # db.drop_all()
         db.create_all()
+        if not schema_is_current():
+            print("⚠️ Database schema is out of date, run: python migrate.py")
     
     @app.route('/health')
     def health():
@@ -37,7 +79,8 @@ def create_app(config_class=Config):
             'endpoints': {
                 'auth': '/api/auth/*',
                 'incidents': '/api/incidents/*',
-                'reports': '/api/accidents/report, /api/mobile/report'
+                'reports': '/api/accidents/report, /api/accidents/report/bulk, /api/mobile/report',
+                'analytics': '/api/analytics/timeseries, /api/analytics/heatmap'
             }
         }), 200
     
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+
+from geo import GEOHASH_ALPHABET
+
+BATCH_WINDOW = 0.25
+ROOM_CELL_PRECISIONS = (3, 4, 5)  # ~156 km, ~39 km and ~5 km cells
+MAX_SUBSCRIPTION_ROOMS = 64
+ALL_ROOM = 'all'
+STATUSES = ('new', 'acknowledged', 'dispatched', 'resolved', 'false_alarm')
+SOURCES = ('CCTV', 'MOBILE', 'BOTH')
+SUMMARY_FIELDS = ('id', 'source', 'camera_id', 'camera_ids', 'lat', 'lng', 'occurred_at', 'created_at', 'updated_at',
+                  'confidence', 'severity', 'status')
+
+
+def incident_summary(incident):
+    # What the live list and map need; media and sensor data are fetched
+    # from /api/incidents/<id> when an incident is opened.
+    data = incident.to_dict(include_media=False, include_mobile=False)
+    summary = {field: data[field] for field in SUMMARY_FIELDS}
+    summary['media_count'] = len(incident.media)
+    return summary
+
+
+def incident_rooms(incident, status=None):
+    rooms = {ALL_ROOM, f'status:{status or incident.status}', f'source:{incident.source}'}
+    if incident.geohash:
+        rooms.update(f'cell:{incident.geohash[:p]}' for p in ROOM_CELL_PRECISIONS)
+    return rooms
+
+
+def subscription_rooms(data):
+    # {"cells": [...], "statuses": [...], "sources": [...]} -> room names. A
+    # client gets every event that matches any of its rooms; no filters
+    # means everything.
+    rooms = []
+    for cell in data.get('cells') or []:
+        if not isinstance(cell, str) or len(cell) not in ROOM_CELL_PRECISIONS \
+                or any(c not in GEOHASH_ALPHABET for c in cell):
+            raise ValueError(f'Invalid cell {cell!r}: geohash of 3, 4 or 5 characters')
+        rooms.append(f'cell:{cell}')
+    for status in data.get('statuses') or []:
+        if status not in STATUSES:
+            raise ValueError(f'Invalid status {status!r}')
+        rooms.append(f'status:{status}')
+    for source in data.get('sources') or []:
+        if source not in SOURCES:
+            raise ValueError(f'Invalid source {source!r}')
+        rooms.append(f'source:{source}')
+    if len(rooms) > MAX_SUBSCRIPTION_ROOMS:
+        raise ValueError(f'At most {MAX_SUBSCRIPTION_ROOMS} subscriptions')
+    return sorted(set(rooms)) or [ALL_ROOM]
+
+
+class IncidentBroadcaster:
+    """Batches incident events into one emit per set of rooms.
+
+    Events are held for a short window and sent as lists:
+    `new_incidents` carries incident summaries and `incident_updates`
+    carries the id plus changed fields. Several changes to one incident
+    inside a window are merged into one entry. Entries bound for the same
+    rooms share one emit addressed to all of them at once, which Socket.IO
+    delivers once per client however many of those rooms it is in.
+    """
+
+    def __init__(self, socketio, window=BATCH_WINDOW):
+        self.socketio = socketio
+        self.window = window
+        self._pending = OrderedDict()
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.window = app.config.get('SOCKETIO_BATCH_WINDOW', BATCH_WINDOW)
+
+    def publish_new(self, incident):
+        self._publish(incident.id, 'new_incidents', incident_summary(incident), incident_rooms(incident))
+
+    def publish_update(self, incident, changes, previous_status=None):
+        # Clients watching the old status also hear that the incident left it.
+        rooms = incident_rooms(incident)
+        if previous_status:
+            rooms |= incident_rooms(incident, previous_status)
+        self._publish(incident.id, 'incident_updates', dict(changes, id=incident.id), rooms)
+
+    def _publish(self, incident_id, event, payload, rooms):
+        with self._lock:
+            entry = self._pending.get(incident_id)
+            if entry is None:
+                self._pending[incident_id] = [event, payload, rooms]
+            else:
+                entry[1].update(payload)
+                entry[2] |= rooms
+            if not self._scheduled:
+                self._scheduled = True
+                self.socketio.start_background_task(self._flush_after_window)
+
+    def _flush_after_window(self):
+        self.socketio.sleep(self.window)
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+            self._scheduled = False
+
+        groups = OrderedDict()
+        for event, payload, rooms in pending.values():
+            groups.setdefault((event, tuple(sorted(rooms))), []).append(payload)
+        for (event, rooms), payloads in groups.items():
+            try:
+                self.socketio.emit(event, payloads, to=list(rooms), namespace='/')
+            except Exception as e:
+                print(f"⚠️ WebSocket broadcast failed: {e}")
+        print(f"✅ WebSocket broadcast: {len(pending)} incident events in {len(groups)} emits")
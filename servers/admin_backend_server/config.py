@@ -20,10 +20,23 @@ class Config:
     VIDEOS_FOLDER = os.path.join(MEDIA_FOLDER, 'videos')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024
     
+    # Mobile report cooldowns, shared by all backend workers on the host.
+    COOLDOWN_DB = os.getenv('COOLDOWN_DB', os.path.join(BASE_DIR, 'cooldowns.db'))
+
+    # Dashboard list responses; set RESPONSE_CACHE_DB to share them between workers.
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 5))
+    RESPONSE_CACHE_DB = os.getenv('RESPONSE_CACHE_DB')
+
     CORS_SUPPORTS_CREDENTIALS = True
     CORS_ORIGINS = ['http://localhost:5173', 'http://localhost:3000']
 
     SOCKETIO_CORS_ALLOWED_ORIGINS = ['http://localhost:5173', 'http://localhost:3000']
+    # Set to run several backend workers: redis://, amqp:// or kafka:// URLs
+    # go to Flask-SocketIO's own queues, sqlite:///<path> uses a SQLite file
+    # shared by the workers on one host. Clients need sticky sessions.
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    # Incident events within this many seconds go out as one batch per room.
+    SOCKETIO_BATCH_WINDOW = float(os.getenv('SOCKETIO_BATCH_WINDOW', 0.25))
     
     @staticmethod
     def init_app(app):
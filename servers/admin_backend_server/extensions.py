@@ -2,11 +2,15 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 from flask_cors import CORS
+from response_cache import ResponseCache
+from broadcaster import IncidentBroadcaster
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 socketio = SocketIO(cors_allowed_origins="*", manage_session=False)
 cors = CORS()
+response_cache = ResponseCache()
+broadcaster = IncidentBroadcaster(socketio)
 
 @login_manager.user_loader
 def load_user(user_id):
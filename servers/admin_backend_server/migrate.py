@@ -0,0 +1,66 @@
+from sqlalchemy import inspect, text
+from app import create_app, ADDED_INCIDENT_COLUMNS
+from extensions import db
+from models import Incident, IncidentRollup
+from geo import geohash_encode
+import rollups
+
+
+def upgrade_schema():
+    # Columns added after the first release; create_all() does not alter tables.
+    columns = {c['name'] for c in inspect(db.engine).get_columns('incidents')}
+    for name, column_type in ADDED_INCIDENT_COLUMNS.items():
+        if name not in columns:
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE incidents ADD COLUMN {name} {column_type}'))
+            print(f"✓ Added incidents.{name}")
+
+
+def upgrade_rollups():
+    # Rollups from before scopes were added are keyed differently. They only
+    # hold derived counts, so the table is recreated and ensure_rollups()
+    # rebuilds it from the incidents.
+    if 'scope' not in {c['name'] for c in inspect(db.engine).get_columns('incident_rollups')}:
+        IncidentRollup.__table__.drop(db.engine)
+        IncidentRollup.__table__.create(db.engine)
+        print("✓ Recreated incident_rollups with scopes")
+
+
+def create_indexes():
+    # create_all() skips tables that already exist, so add indexes
+    # introduced after a database was first created.
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def backfill_geohashes(batch_size=1000):
+    while True:
+        incidents = Incident.query.filter(Incident.geohash.is_(None)).limit(batch_size).all()
+        if not incidents:
+            break
+        for incident in incidents:
+            incident.geohash = geohash_encode(incident.lat, incident.lng)
+        db.session.commit()
+        print(f"✓ Backfilled geohash for {len(incidents)} incidents")
+
+
+def migrate_database():
+    # Run once per deploy, before the workers start; create_app() only
+    # creates missing tables, so concurrent workers never race on this.
+    app = create_app()
+
+    with app.app_context():
+        upgrade_schema()
+        upgrade_rollups()
+        create_indexes()
+        # Rollups first: the geohash backfill then moves their counts into
+        # the right cells through the normal update hooks.
+        rollups.ensure_rollups()
+        backfill_geohashes()
+
+        print("\n✅ Database is up to date")
+
+
+if __name__ == '__main__':
+    migrate_database()
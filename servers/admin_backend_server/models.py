@@ -1,5 +1,7 @@
 from datetime import datetime
+from sqlalchemy import event
 from extensions import db
+from geo import geohash_encode
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
@@ -40,11 +42,13 @@ class Incident(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     source = db.Column(db.String(20), nullable=False)  # CCTV, MOBILE, BOTH
     camera_id = db.Column(db.String(50), nullable=True)
+    camera_ids = db.Column(db.Text, nullable=True)  # comma separated, when the gateway merged several cameras
     mobile_report_id = db.Column(db.Integer, db.ForeignKey('mobile_reports.id'), nullable=True)
     
     # Location
     lat = db.Column(db.Float, nullable=False)
     lng = db.Column(db.Float, nullable=False)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # kept in sync with lat/lng
     
     # Timestamps
     occurred_at = db.Column(db.DateTime, nullable=False)
@@ -60,6 +64,15 @@ class Incident(db.Model):
     status = db.Column(db.String(20), nullable=False, default='new', index=True)
     # Possible values: new, acknowledged, dispatched, resolved, false_alarm
     
+    # Keyset pagination walks (created_at, id) descending, optionally after
+    # an equality filter on one of these columns.
+    __table_args__ = (
+        db.Index('ix_incidents_created_id', 'created_at', 'id'),
+        db.Index('ix_incidents_status_created_id', 'status', 'created_at', 'id'),
+        db.Index('ix_incidents_source_created_id', 'source', 'created_at', 'id'),
+        db.Index('ix_incidents_camera_created_id', 'camera_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     media = db.relationship('Media', backref='incident', lazy=True, cascade='all, delete-orphan')
     action_logs = db.relationship('ActionLog', backref='incident', lazy=True, cascade='all, delete-orphan')
@@ -70,6 +83,8 @@ class Incident(db.Model):
             'id': self.id,
             'source': self.source,
             'camera_id': self.camera_id,
+            'camera_ids': self.camera_ids.split(',') if self.camera_ids else
+                          [self.camera_id] if self.camera_id else [],
             'lat': self.lat,
             'lng': self.lng,
             'occurred_at': self.occurred_at.isoformat(),
@@ -90,6 +105,36 @@ class Incident(db.Model):
         return data
 
 
+@event.listens_for(Incident, 'before_insert')
+@event.listens_for(Incident, 'before_update')
+def set_incident_geohash(mapper, connection, incident):
+    if incident.lat is not None and incident.lng is not None:
+        incident.geohash = geohash_encode(incident.lat, incident.lng)
+
+
+class IncidentRollup(db.Model):
+    """Incident counts per hour/day bucket, maintained by rollups.py"""
+    __tablename__ = 'incident_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(4), nullable=False)  # hour, day
+    bucket = db.Column(db.DateTime, nullable=False)  # UTC start of the bucket
+    scope = db.Column(db.String(12), nullable=False)  # all, total or the one column the row counts by
+    source = db.Column(db.String(20), nullable=False)
+    camera_id = db.Column(db.String(50), nullable=False, default='')  # '' when none
+    severity = db.Column(db.String(20), nullable=False, default='')  # '' when none
+    status = db.Column(db.String(20), nullable=False)
+    cell = db.Column(db.String(12), nullable=False, default='')  # geohash prefix
+    incident_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Leads with (granularity, scope, bucket), so it also serves the range
+    # scans in routes/analytics.py.
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'scope', 'bucket', 'source', 'camera_id', 'severity', 'status', 'cell',
+                            name='uq_incident_rollups_key'),
+    )
+
+
 class MobileReport(db.Model):
     """Mobile app sensor data report"""
     __tablename__ = 'mobile_reports'
@@ -129,7 +174,7 @@ class Media(db.Model):
     __tablename__ = 'media'
     
     id = db.Column(db.Integer, primary_key=True)
-    incident_id = db.Column(db.Integer, db.ForeignKey('incidents.id'), nullable=False)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incidents.id'), nullable=False, index=True)
     media_type = db.Column(db.String(20), nullable=False)  # snapshot, video
     file_path = db.Column(db.String(500), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -141,6 +186,7 @@ class Media(db.Model):
             'media_type': self.media_type,
             'file_path': self.file_path,
             'url': f'/api/media/{self.id}',
+            'thumbnail_url': f'/api/incidents/media/{self.id}/thumbnail',
             'created_at': self.created_at.isoformat()
         }
 
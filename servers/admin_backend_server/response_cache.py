@@ -0,0 +1,138 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+
+DEFAULT_TTL = 5
+MAX_ENTRIES = 512
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, etag, body, ttl):
+        with self._lock:
+            self._entries[key] = (etag, body, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    # Lets every worker process on a host share entries and invalidations.
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS response_cache "
+                           "(key TEXT PRIMARY KEY, etag TEXT, body BLOB, expires_at REAL) WITHOUT ROWID")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS response_cache_generation (id INTEGER PRIMARY KEY, value INTEGER)")
+        self._conn.execute("INSERT OR IGNORE INTO response_cache_generation (id, value) VALUES (1, 0)")
+
+    def generation(self):
+        with self._lock:
+            return self._conn.execute("SELECT value FROM response_cache_generation WHERE id = 1").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT etag, body FROM response_cache WHERE key = ? AND expires_at > ?",
+                                     (key, time.time())).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def set(self, key, etag, body, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO response_cache (key, etag, body, expires_at) VALUES (?, ?, ?, ?)",
+                               (key, etag, body, now + ttl))
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache ORDER BY expires_at "
+                "LIMIT MAX(0, (SELECT COUNT(*) FROM response_cache) - ?))", (self.max_entries,))
+
+    def bump(self):
+        with self._lock:
+            self._conn.execute("UPDATE response_cache_generation SET value = value + 1 WHERE id = 1")
+            self._conn.execute("DELETE FROM response_cache")
+
+
+class ResponseCache:
+    """Read-through cache for JSON GET endpoints with ETag support.
+
+    Entries are keyed by path, sorted query parameters and a generation
+    number; invalidate() bumps the generation, so every cached list goes
+    stale at once when an incident is created or updated.
+    """
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.default_ttl = DEFAULT_TTL
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.default_ttl = app.config.get('RESPONSE_CACHE_TTL', DEFAULT_TTL)
+        path = app.config.get('RESPONSE_CACHE_DB')
+        self.backend = SQLiteBackend(path) if path else MemoryBackend()
+
+    def _key(self):
+        args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        return f"{self.backend.generation()}:{request.path}?{args}"
+
+    def invalidate(self):
+        self.backend.bump()
+
+    def cached(self, ttl=None):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self._key()
+                hit = self.backend.get(key)
+                if hit is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()
+                    self.backend.set(key, etag, body, ttl or self.default_ttl)
+                else:
+                    etag, body = hit
+                    response = make_response(body, 200, {'Content-Type': 'application/json'})
+
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                if request.if_none_match.contains(etag):
+                    response = make_response('', 304)
+                    response.set_etag(etag)
+                return response
+            return wrapper
+        return decorator
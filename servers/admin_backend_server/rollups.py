@@ -0,0 +1,138 @@
+from collections import Counter
+from datetime import timezone
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Incident, IncidentRollup
+
+GRANULARITIES = ('hour', 'day')
+DIMENSIONS = ('source', 'camera_id', 'severity', 'status')
+CELL_PRECISION = 5  # ~5 km cells
+TRACKED = ('occurred_at',) + DIMENSIONS + ('geohash',)  # incident attributes the rollup keys derive from
+KEY_COLUMNS = ['granularity', 'scope', 'bucket', 'source', 'camera_id', 'severity', 'status', 'cell']
+REBUILD_BATCH = 5000
+
+# Every incident is counted in several rollups per bucket: one keyed by all
+# columns, one bucket total, and one per column on its own. Grouping by
+# every column gives close to one row per incident, so queries read the
+# smallest rollup that has the columns they filter or group on.
+FULL_SCOPE = 'all'
+TOTAL_SCOPE = 'total'
+SCOPE_COLUMNS = DIMENSIONS + ('cell',)
+
+
+def bucket_start(ts, granularity):
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if granularity == 'day' else ts
+
+
+def rollup_scope(columns):
+    columns = set(columns)
+    if not columns:
+        return TOTAL_SCOPE
+    if len(columns) == 1:
+        return columns.pop()
+    return FULL_SCOPE
+
+
+def rollup_keys(occurred_at, source, camera_id, severity, status, geohash):
+    dims = (source, camera_id or '', severity or '', status, (geohash or '')[:CELL_PRECISION])
+    scoped = [(FULL_SCOPE, dims), (TOTAL_SCOPE, ('',) * len(dims))]
+    for i, column in enumerate(SCOPE_COLUMNS):
+        scoped.append((column, tuple(value if j == i else '' for j, value in enumerate(dims))))
+    keys = []
+    for granularity in GRANULARITIES:
+        bucket = bucket_start(occurred_at, granularity)
+        keys.extend((granularity, scope, bucket) + values for scope, values in scoped)
+    return keys
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the old value before an attribute is set, even on an expired
+# instance, so an update can take its counts out of the old rollup rows.
+for _name in TRACKED:
+    event.listen(getattr(Incident, _name), 'set', _keep_previous, active_history=True)
+
+
+def _values(incident, previous=False):
+    # Current attribute values, or the ones loaded before this flush.
+    state = inspect(incident)
+    values = []
+    for name in TRACKED:
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(getattr(incident, name))
+    return values
+
+
+def apply_deltas(connection, deltas):
+    rows = [dict(zip(KEY_COLUMNS, key), incident_count=delta) for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = IncidentRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={'incident_count': table.c.incident_count + stmt.excluded.incident_count})
+        connection.execute(stmt)
+        return
+    for row in rows:
+        key = [table.c[name] == row[name] for name in KEY_COLUMNS]
+        result = connection.execute(table.update().where(*key).values(
+            incident_count=table.c.incident_count + row['incident_count']))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+# The rollups are updated in the same flush, on the same connection, as the
+# incident itself, so they commit or roll back together with it.
+
+@event.listens_for(Incident, 'after_insert')
+def rollup_insert(mapper, connection, incident):
+    apply_deltas(connection, Counter(rollup_keys(*_values(incident))))
+
+
+@event.listens_for(Incident, 'after_update')
+def rollup_update(mapper, connection, incident):
+    deltas = Counter(rollup_keys(*_values(incident)))
+    deltas.subtract(rollup_keys(*_values(incident, previous=True)))
+    apply_deltas(connection, deltas)
+
+
+@event.listens_for(Incident, 'after_delete')
+def rollup_delete(mapper, connection, incident):
+    deltas = Counter()
+    deltas.subtract(rollup_keys(*_values(incident, previous=True)))
+    apply_deltas(connection, deltas)
+
+
+def rebuild_rollups():
+    # Recomputes every rollup row from the incidents table; used once for
+    # databases that predate the rollups.
+    columns = [getattr(Incident, name) for name in TRACKED]
+    counts = Counter()
+    for row in db.session.query(*columns).yield_per(REBUILD_BATCH):
+        counts.update(rollup_keys(*row))
+    IncidentRollup.query.delete()
+    rows = [dict(zip(KEY_COLUMNS, key), incident_count=count) for key, count in counts.items()]
+    for start in range(0, len(rows), REBUILD_BATCH):
+        db.session.execute(IncidentRollup.__table__.insert(), rows[start:start + REBUILD_BATCH])
+    db.session.commit()
+    print(f"Rebuilt {len(rows)} incident rollup rows")
+
+
+def ensure_rollups():
+    if not db.session.query(IncidentRollup.id).first() and db.session.query(Incident.id).first():
+        rebuild_rollups()
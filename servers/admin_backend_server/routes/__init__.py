@@ -4,7 +4,9 @@ def register_routes(app):
     from routes.auth import auth_bp
     from routes.incidents import incidents_bp
     from routes.reports import reports_bp
+    from routes.analytics import analytics_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(incidents_bp, url_prefix='/api/incidents')
-    app.register_blueprint(reports_bp, url_prefix='/api')
\ No newline at end of file
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
\ No newline at end of file
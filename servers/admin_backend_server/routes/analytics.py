@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from sqlalchemy import func
+from models import IncidentRollup
+from extensions import response_cache
+from rollups import CELL_PRECISION, DIMENSIONS, bucket_start, rollup_scope
+from geo import geohash_decode
+
+analytics_bp = Blueprint('analytics', __name__)
+
+BUCKET_STEP = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+DEFAULT_RANGE = {'hour': timedelta(hours=48), 'day': timedelta(days=30)}
+MAX_BUCKETS = 2000
+
+
+def parse_window(granularity):
+    # Returns (start, end) as bucket starts, end inclusive; raises ValueError.
+    if granularity not in BUCKET_STEP:
+        raise ValueError('granularity must be hour or day')
+    end = request.args.get('end')
+    end = datetime.fromisoformat(end.replace('Z', '+00:00')) if end else datetime.utcnow()
+    start = request.args.get('start')
+    start = datetime.fromisoformat(start.replace('Z', '+00:00')) if start else end - DEFAULT_RANGE[granularity]
+    start, end = bucket_start(start, granularity), bucket_start(end, granularity)
+    if start > end:
+        raise ValueError('start must be before end')
+    if (end - start) / BUCKET_STEP[granularity] >= MAX_BUCKETS:
+        raise ValueError(f'At most {MAX_BUCKETS} buckets per query')
+    return start, end
+
+
+def rollup_query(granularity, start, end, *columns):
+    # columns: the rollup columns the caller groups on, besides the bucket.
+    filters = {field: request.args.get(field) for field in DIMENSIONS if request.args.get(field)}
+    query = IncidentRollup.query.filter(
+        IncidentRollup.granularity == granularity,
+        IncidentRollup.scope == rollup_scope(set(filters) | set(columns)),
+        IncidentRollup.bucket.between(start, end)
+    )
+    for field, value in filters.items():
+        query = query.filter(getattr(IncidentRollup, field) == value)
+    return query
+
+
+@analytics_bp.route('/timeseries', methods=['GET'])
+@login_required
+@response_cache.cached()
+def timeseries():
+    granularity = request.args.get('granularity', 'day')
+    group_by = request.args.get('group_by')
+    try:
+        start, end = parse_window(granularity)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if group_by and group_by not in DIMENSIONS:
+        return jsonify({'error': f'group_by must be one of: {list(DIMENSIONS)}'}), 400
+
+    columns = [IncidentRollup.bucket]
+    if group_by:
+        columns.append(getattr(IncidentRollup, group_by))
+    total = func.sum(IncidentRollup.incident_count)
+    rows = rollup_query(granularity, start, end, *filter(None, [group_by])).with_entities(
+        *columns, total
+    ).group_by(*columns).having(total != 0).all()
+
+    counts = {}
+    for row in rows:
+        key = (row[1] or None) if group_by else 'total'
+        counts.setdefault(key, {})[row[0]] = int(row[-1])
+
+    # Zero-filled so every series has one point per bucket.
+    buckets = []
+    bucket = start
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket += BUCKET_STEP[granularity]
+
+    series = [{
+        'key': key,
+        'total': sum(points.values()),
+        'points': [{'bucket': b.isoformat(), 'count': points.get(b, 0)} for b in buckets]
+    } for key, points in counts.items()]
+    series.sort(key=lambda s: s['total'], reverse=True)
+
+    return jsonify({
+        'granularity': granularity,
+        'group_by': group_by,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': series
+    }), 200
+
+
+@analytics_bp.route('/heatmap', methods=['GET'])
+@login_required
+@response_cache.cached()
+def heatmap():
+    granularity = request.args.get('granularity', 'day')
+    precision = request.args.get('precision', CELL_PRECISION, type=int)
+    try:
+        start, end = parse_window(granularity)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not 1 <= precision <= CELL_PRECISION:
+        return jsonify({'error': f'precision must be between 1 and {CELL_PRECISION}'}), 400
+
+    cell = func.substr(IncidentRollup.cell, 1, precision)
+    total = func.sum(IncidentRollup.incident_count)
+    rows = rollup_query(granularity, start, end, 'cell').filter(IncidentRollup.cell != '').with_entities(
+        cell, total
+    ).group_by(cell).having(total != 0).all()
+
+    cells = []
+    for geohash, count in rows:
+        lat, lng = geohash_decode(geohash)
+        cells.append({'cell': geohash, 'lat': lat, 'lng': lng, 'count': int(count)})
+    cells.sort(key=lambda c: c['count'], reverse=True)
+
+    return jsonify({
+        'granularity': granularity,
+        'precision': precision,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'cells': cells,
+        'total': sum(c['count'] for c in cells)
+    }), 200
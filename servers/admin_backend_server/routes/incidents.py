@@ -1,39 +1,224 @@
 from flask import Blueprint, request, jsonify, send_file
 from flask_login import login_required, current_user
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.orm import selectinload
 from models import Incident, ActionLog, Media
-from extensions import db, socketio
-from utils import get_media_full_path
+from extensions import db, broadcaster, response_cache
+from utils import get_media_full_path, get_thumbnail_full_path, encode_cursor, decode_cursor
+from geo import geohash_cover, geohash_successor, haversine_m, radius_bbox, zoom_precision
 from datetime import datetime
 import os
 
 incidents_bp = Blueprint('incidents', __name__)
 
+MAX_PAGE_SIZE = 500
+COUNT_ESTIMATE_CAP = 10000
+MAX_AREA_RESULTS = 2000
+MAX_RADIUS_M = 50000
+
+
+def count_incidents(query, mode, filtered):
+    # exact: COUNT(*) over the filtered rows. estimate: the planner's row
+    # count on PostgreSQL when unfiltered, otherwise a count that stops at
+    # COUNT_ESTIMATE_CAP rows. Returns (count, is_estimate).
+    if mode == 'exact':
+        return query.order_by(None).count(), False
+    if not filtered and db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'incidents'")).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate), True
+    capped = query.order_by(None).with_entities(Incident.id).limit(COUNT_ESTIMATE_CAP + 1).subquery()
+    count = db.session.query(func.count()).select_from(capped).scalar()
+    return min(count, COUNT_ESTIMATE_CAP), count > COUNT_ESTIMATE_CAP
+
 @incidents_bp.route('', methods=['GET'])
 @login_required
+@response_cache.cached()
 def list_incidents():
     status = request.args.get('status')
     source = request.args.get('source')
-    limit = request.args.get('limit', 100, type=int)
+    camera_id = request.args.get('camera_id')
+    limit = max(1, min(request.args.get('limit', 100, type=int), MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor')
+    count_mode = request.args.get('count')
     
-    query = Incident.query
+    if count_mode not in (None, 'exact', 'estimate'):
+        return jsonify({'error': 'count must be exact or estimate'}), 400
+    
+    # Related rows are loaded with one IN query per relationship instead of
+    # lazily per incident in to_dict().
+    query = Incident.query.options(
+        selectinload(Incident.media),
+        selectinload(Incident.mobile_report)
+    )
     
     if status:
         query = query.filter_by(status=status)
     if source:
         query = query.filter_by(source=source)
+    if camera_id:
+        query = query.filter_by(camera_id=camera_id)
+    filtered_query = query
     
-    incidents = query.order_by(Incident.created_at.desc()).limit(limit).all()
+    # Keyset pagination: the cursor is the (created_at, id) of the last row
+    # of the previous page, so every page is an index range scan.
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(or_(
+            Incident.created_at < cursor_created_at,
+            and_(Incident.created_at == cursor_created_at, Incident.id < cursor_id)
+        ))
     
-    return jsonify({
+    incidents = query.order_by(Incident.created_at.desc(), Incident.id.desc()).limit(limit + 1).all()
+    has_more = len(incidents) > limit
+    incidents = incidents[:limit]
+    
+    response = {
         'incidents': [inc.to_dict() for inc in incidents],
-        'total': len(incidents)
+        'total': len(incidents),
+        'has_more': has_more,
+        'next_cursor': encode_cursor(incidents[-1].created_at, incidents[-1].id) if has_more else None
+    }
+    if count_mode:
+        count, estimated = count_incidents(filtered_query, count_mode, bool(status or source or camera_id))
+        response['total_count'] = count
+        response['total_count_estimated'] = estimated
+    
+    return jsonify(response), 200
+
+
+def area_query(min_lat, min_lng, max_lat, max_lng):
+    # The box is covered by a few geohash prefixes, each an index range scan
+    # on incidents.geohash; the lat/lng filter then trims the cells' overhang.
+    ranges = []
+    for prefix in geohash_cover(min_lat, min_lng, max_lat, max_lng):
+        upper = geohash_successor(prefix)
+        if upper is None:
+            ranges.append(Incident.geohash >= prefix)
+        else:
+            ranges.append(and_(Incident.geohash >= prefix, Incident.geohash < upper))
+    query = Incident.query
+    if ranges:
+        query = query.filter(or_(*ranges))
+    return query.filter(Incident.lat.between(min_lat, max_lat), Incident.lng.between(min_lng, max_lng))
+
+
+def filter_area_query(query):
+    for field in ('status', 'source', 'camera_id'):
+        value = request.args.get(field)
+        if value:
+            query = query.filter(getattr(Incident, field) == value)
+    return query
+
+
+def cluster_incidents(query, zoom):
+    # One row per geohash cell at the zoom's precision: count, centroid and
+    # the newest incident id, for map markers that expand on zoom-in.
+    cell = func.substr(Incident.geohash, 1, zoom_precision(zoom))
+    rows = query.with_entities(
+        cell.label('cell'),
+        func.count(Incident.id),
+        func.avg(Incident.lat),
+        func.avg(Incident.lng),
+        func.max(Incident.id)
+    ).group_by(cell).all()
+    return [{
+        'cell': row[0],
+        'count': row[1],
+        'lat': float(row[2]),
+        'lng': float(row[3]),
+        'latest_incident_id': row[4]
+    } for row in rows]
+
+
+@incidents_bp.route('/bbox', methods=['GET'])
+@login_required
+@response_cache.cached()
+def incidents_in_bbox():
+    try:
+        min_lat = float(request.args['min_lat'])
+        min_lng = float(request.args['min_lng'])
+        max_lat = float(request.args['max_lat'])
+        max_lng = float(request.args['max_lng'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'min_lat, min_lng, max_lat and max_lng required'}), 400
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        return jsonify({'error': 'Invalid bounding box'}), 400
+    zoom = request.args.get('zoom', type=int)
+    limit = max(1, min(request.args.get('limit', 500, type=int), MAX_AREA_RESULTS))
+    
+    query = filter_area_query(area_query(min_lat, min_lng, max_lat, max_lng))
+    
+    if zoom is not None:
+        clusters = cluster_incidents(query, zoom)
+        return jsonify({'clusters': clusters, 'total': sum(c['count'] for c in clusters)}), 200
+    
+    incidents = query.options(
+        selectinload(Incident.media),
+        selectinload(Incident.mobile_report)
+    ).order_by(Incident.created_at.desc(), Incident.id.desc()).limit(limit + 1).all()
+    
+    return jsonify({
+        'incidents': [inc.to_dict() for inc in incidents[:limit]],
+        'total': min(len(incidents), limit),
+        'has_more': len(incidents) > limit
     }), 200
 
 
+@incidents_bp.route('/nearby', methods=['GET'])
+@login_required
+@response_cache.cached()
+def incidents_nearby():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng required'}), 400
+    radius_m = request.args.get('radius_m', 1000, type=float)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or not 0 < radius_m <= MAX_RADIUS_M:
+        return jsonify({'error': f'Invalid location or radius_m (max {MAX_RADIUS_M})'}), 400
+    limit = max(1, min(request.args.get('limit', 100, type=int), MAX_AREA_RESULTS))
+    
+    # Candidates come from the enclosing box; the exact distance drops the
+    # corners outside the circle. Only the rows returned are fully loaded.
+    candidates = filter_area_query(area_query(*radius_bbox(lat, lng, radius_m))).with_entities(
+        Incident.id, Incident.lat, Incident.lng
+    ).all()
+    
+    nearby = []
+    for incident_id, incident_lat, incident_lng in candidates:
+        distance = haversine_m(lat, lng, incident_lat, incident_lng)
+        if distance <= radius_m:
+            nearby.append((distance, incident_id))
+    nearby.sort()
+    
+    page = nearby[:limit]
+    incidents = {inc.id: inc for inc in Incident.query.options(
+        selectinload(Incident.media),
+        selectinload(Incident.mobile_report)
+    ).filter(Incident.id.in_([incident_id for _, incident_id in page])).all()} if page else {}
+    
+    results = []
+    for distance, incident_id in page:
+        data = incidents[incident_id].to_dict()
+        data['distance_m'] = round(distance, 1)
+        results.append(data)
+    
+    return jsonify({'incidents': results, 'total': len(results), 'has_more': len(nearby) > limit}), 200
+
+
 @incidents_bp.route('/<int:incident_id>', methods=['GET'])
 @login_required
 def get_incident(incident_id):
-    incident = Incident.query.get_or_404(incident_id)
+    incident = Incident.query.options(
+        selectinload(Incident.media),
+        selectinload(Incident.mobile_report),
+        selectinload(Incident.action_logs).joinedload(ActionLog.user)
+    ).get_or_404(incident_id)
     
     # Include action logs
     incident_data = incident.to_dict()
@@ -65,6 +250,7 @@ def take_action(incident_id):
         'false_alarm': 'false_alarm'
     }
     
+    previous_status = incident.status
     incident.status = status_map[action_type]
     incident.updated_at = datetime.utcnow()
     
@@ -78,12 +264,14 @@ def take_action(incident_id):
     
     db.session.add(action_log)
     db.session.commit()
+    response_cache.invalidate()
     
 
-    socketio.emit('incident_update', {
-        'incident': incident.to_dict(),
+    broadcaster.publish_update(incident, {
+        'status': incident.status,
+        'updated_at': incident.updated_at.isoformat(),
         'action': action_log.to_dict()
-    })
+    }, previous_status=previous_status)
     
     return jsonify({
         'message': f'Action {action_type} completed',
@@ -100,4 +288,17 @@ def get_media(media_id):
     if not os.path.exists(full_path):
         return jsonify({'error': 'Media file not found'}), 404
     
-    return send_file(full_path)
\ No newline at end of file
+    return send_file(full_path)
+
+
+@incidents_bp.route('/media/<int:media_id>/thumbnail', methods=['GET'])
+@login_required
+def get_media_thumbnail(media_id):
+    media = Media.query.get_or_404(media_id)
+    # Media stored before thumbnails existed falls back to the full file.
+    full_path = get_thumbnail_full_path(media.file_path) or get_media_full_path(media.file_path)
+    
+    if not os.path.exists(full_path):
+        return jsonify({'error': 'Media file not found'}), 404
+    
+    return send_file(full_path)
@@ -1,74 +1,98 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import Incident, MobileReport, Media
-from extensions import db, socketio
-from utils import save_media_file
-from datetime import datetime, timezone
+from extensions import db, broadcaster, response_cache
+from utils import save_media_file, wait_for_media, parse_utc_timestamp
+from datetime import datetime
 import time
 import json
 
-mobile_cooldowns = {}
 MOBILE_REPORT_COOLDOWN = 1800
 reports_bp = Blueprint('reports', __name__)
 
+def _create_cctv_incident(fields, files, snapshot_key='snapshot', video_key='video'):
+    camera_id = fields.get('camera_id')
+    lat = float(fields.get('lat', 0))
+    lng = float(fields.get('lng', 0))
+    occurred_at_str = fields.get('occurred_at')
+    confidence = fields.get('confidence')
+    confidence = float(confidence) if confidence not in (None, '') else None
+    severity = fields.get('severity', 'medium')
+    camera_ids = fields.get('camera_ids') or None
+
+    if not camera_id or not occurred_at_str:
+        raise ValueError('camera_id and occurred_at required')
+
+    # Alerts can reach us long after the event (spooled on the edge, retried
+    # and held for correlation in the gateway), so keep the reported time.
+    occurred_at = parse_utc_timestamp(occurred_at_str) or datetime.utcnow()
+
+    incident = Incident(
+        source='CCTV',
+        camera_id=camera_id,
+        camera_ids=camera_ids,
+        lat=lat,
+        lng=lng,
+        occurred_at=occurred_at,
+        confidence=confidence,
+        severity=severity,
+        status='new'
+    )
+
+    db.session.add(incident)
+    db.session.flush()
+
+    # Correlated reports from the gateway carry one snapshot/video part per camera.
+    stored = []
+    for snapshot_file in files.getlist(snapshot_key):
+        snapshot_path = save_media_file(snapshot_file, 'snapshot')
+        if snapshot_path:
+            stored.append(snapshot_path)
+            media = Media(
+                incident_id=incident.id,
+                media_type='snapshot',
+                file_path=snapshot_path
+            )
+            db.session.add(media)
+
+    for video_file in files.getlist(video_key):
+        video_path = save_media_file(video_file, 'video')
+        if video_path:
+            stored.append(video_path)
+            media = Media(
+                incident_id=incident.id,
+                media_type='video',
+                file_path=video_path
+            )
+            db.session.add(media)
+
+    wait_for_media(stored)
+
+    if camera_ids:
+        print(f"🔗 Incident #{incident.id} merges alerts from cameras {camera_ids}")
+
+    return incident
+
+
+def _broadcast_new_incident(incident):
+    response_cache.invalidate()
+    try:
+        broadcaster.publish_new(incident)
+    except Exception as e:
+        print(f"⚠️ WebSocket broadcast failed: {e}")
+
+
 @reports_bp.route('/accidents/report', methods=['POST'])
 def report_cctv_accident():
     try:
-        camera_id = request.form.get('camera_id')
-        lat = float(request.form.get('lat', 0))
-        lng = float(request.form.get('lng', 0))
-        occurred_at_str = request.form.get('occurred_at')
-        confidence = request.form.get('confidence', type=float)
-        severity = request.form.get('severity', 'medium')
-        
-        if not camera_id or not occurred_at_str:
-            return jsonify({'error': 'camera_id and occurred_at required'}), 400
-        
-        occurred_at = datetime.now()
-        
-        incident = Incident(
-            source='CCTV',
-            camera_id=camera_id,
-            lat=lat,
-            lng=lng,
-            occurred_at=occurred_at,
-            confidence=confidence,
-            severity=severity,
-            status='new'
-        )
-        
-        db.session.add(incident)
-        db.session.flush()
-        
-        if 'snapshot' in request.files:
-            snapshot_file = request.files['snapshot']
-            snapshot_path = save_media_file(snapshot_file, 'snapshot')
-            if snapshot_path:
-                media = Media(
-                    incident_id=incident.id,
-                    media_type='snapshot',
-                    file_path=snapshot_path
-                )
-                db.session.add(media)
-        
-        if 'video' in request.files:
-            video_file = request.files['video']
-            video_path = save_media_file(video_file, 'video')
-            if video_path:
-                media = Media(
-                    incident_id=incident.id,
-                    media_type='video',
-                    file_path=video_path
-                )
-                db.session.add(media)
-        
+        try:
+            incident = _create_cctv_incident(request.form, request.files)
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
         db.session.commit()
+        _broadcast_new_incident(incident)
 
-        try:
-            socketio.emit('new_incident', incident.to_dict(), namespace='/')
-            print(f"✅ WebSocket broadcast: new_incident #{incident.id}")
-        except Exception as e:
-            print(f"⚠️ WebSocket broadcast failed: {e}")
-        
         return jsonify({
             'message': 'Accident reported successfully',
             'incident_id': incident.id
@@ -79,8 +103,49 @@ def report_cctv_accident():
         return jsonify({'error': str(e)}), 500
 
 
+@reports_bp.route('/accidents/report/bulk', methods=['POST'])
+def report_cctv_accidents_bulk():
+    # `reports` is a JSON list of the single-report form fields plus a `ref`;
+    # each report's files are sent as snapshot_<ref> / video_<ref>. Invalid
+    # reports are returned with an error instead of failing the whole batch,
+    # and everything valid is committed in one transaction.
+    try:
+        reports = json.loads(request.form.get('reports', '[]'))
+    except ValueError:
+        return jsonify({'error': 'reports must be a JSON list'}), 400
+    if not isinstance(reports, list) or not reports:
+        return jsonify({'error': 'reports must be a non-empty JSON list'}), 400
+
+    try:
+        results, created = [], []
+        for report in reports:
+            ref = str(report.get('ref', len(results)))
+            try:
+                with db.session.begin_nested():
+                    incident = _create_cctv_incident(report, request.files,
+                                                     f'snapshot_{ref}', f'video_{ref}')
+                created.append(incident)
+                results.append({'ref': ref, 'incident_id': incident.id})
+            except ValueError as e:
+                results.append({'ref': ref, 'error': str(e)})
+
+        db.session.commit()
+        for incident in created:
+            _broadcast_new_incident(incident)
+
+        return jsonify({
+            'message': f'{len(created)} accidents reported',
+            'results': results
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @reports_bp.route('/mobile/report', methods=['POST'])
 def report_mobile_accident():
+    cooldown_key = None
     try:
         user_id = request.form.get('user_id')
         lat = float(request.form.get('lat', 0))
@@ -93,12 +158,19 @@ def report_mobile_accident():
         
         if not timestamp_str:
             return jsonify({'error': 'timestamp required'}), 400
-        
-        try:
-            timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-        except:
-            timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
-        timestamp = datetime.now()
+
+        cooldowns = current_app.extensions['cooldowns']
+        if user_id:
+            acquired, remaining = cooldowns.try_acquire(f"mobile:{user_id}", MOBILE_REPORT_COOLDOWN)
+            if not acquired:
+                print(f"⏳ Mobile report from {user_id} suppressed (cooldown {int(remaining)}s)")
+                return jsonify({
+                    'message': 'Report suppressed, cooldown active',
+                    'retry_after': int(remaining)
+                }), 200
+            cooldown_key = f"mobile:{user_id}"
+        
+        timestamp = parse_utc_timestamp(timestamp_str) or datetime.utcnow()
 
         mobile_report = MobileReport(
             user_id=user_id,
@@ -127,10 +199,12 @@ def report_mobile_accident():
         db.session.add(incident)
         db.session.flush()
         
+        stored = []
         if 'snapshot' in request.files:
             snapshot_file = request.files['snapshot']
             snapshot_path = save_media_file(snapshot_file, 'snapshot')
             if snapshot_path:
+                stored.append(snapshot_path)
                 media = Media(
                     incident_id=incident.id,
                     media_type='snapshot',
@@ -142,6 +216,7 @@ def report_mobile_accident():
             video_file = request.files['video']
             video_path = save_media_file(video_file, 'video')
             if video_path:
+                stored.append(video_path)
                 media = Media(
                     incident_id=incident.id,
                     media_type='video',
@@ -149,10 +224,9 @@ def report_mobile_accident():
                 )
                 db.session.add(media)
         
+        wait_for_media(stored)
         db.session.commit()
-        
-
-        socketio.emit('new_incident', incident.to_dict())
+        _broadcast_new_incident(incident)
         
         return jsonify({
             'message': 'Mobile accident reported successfully',
@@ -162,4 +236,7 @@ def report_mobile_accident():
         
     except Exception as e:
         db.session.rollback()
+        if cooldown_key:
+            # Let the phone retry instead of suppressing a report that was never stored.
+            current_app.extensions['cooldowns'].release(cooldown_key)
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,7 @@
-from flask_socketio import emit, disconnect
+from flask_socketio import emit, disconnect, join_room, leave_room, rooms
 from flask_login import current_user
 from extensions import socketio
+from broadcaster import ALL_ROOM, subscription_rooms
 from flask import request
 
 @socketio.on('connect')
@@ -11,6 +12,7 @@ def handle_connect():
         return False
     
     print(f'WebSocket connected: {current_user.username}')
+    join_room(ALL_ROOM)
     emit('connection_status', {'status': 'connected', 'user': current_user.username})
 
 
@@ -22,4 +24,21 @@ def handle_disconnect():
 
 @socketio.on('ping')
 def handle_ping():
-    emit('pong', {'timestamp': 'alive'})
\ No newline at end of file
+    emit('pong', {'timestamp': 'alive'})
+
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    # Replaces the client's rooms; see broadcaster.subscription_rooms.
+    try:
+        wanted = subscription_rooms(data or {})
+    except (ValueError, AttributeError) as e:
+        emit('subscription_error', {'error': str(e)})
+        return
+    
+    for room in rooms():
+        if room != request.sid and room not in wanted:
+            leave_room(room)
+    for room in wanted:
+        join_room(room)
+    emit('subscribed', {'rooms': wanted})
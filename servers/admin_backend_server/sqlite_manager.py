@@ -0,0 +1,64 @@
+import json
+import sqlite3
+import threading
+import time
+
+from socketio import PubSubManager
+
+POLL_INTERVAL = 0.05
+RETENTION_SECONDS = 60
+PRUNE_EVERY = 200
+BUSY_TIMEOUT_MS = 5000
+
+
+class SQLiteManager(PubSubManager):
+    """Socket.IO client manager that relays emits through a SQLite file.
+
+    A stand-in for the Redis/Kafka/AMQP queues Flask-SocketIO supports, for
+    running several workers on one host without a broker. Every worker
+    appends emits to a WAL-mode table and polls it for rows newer than the
+    last one it has seen; rows older than RETENTION_SECONDS are pruned.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, channel='socketio', write_only=False, logger=None,
+                 poll_interval=POLL_INTERVAL):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._published = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=BUSY_TIMEOUT_MS / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS socketio_messages "
+                           "(id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, "
+                           "created_at REAL NOT NULL, payload TEXT NOT NULL)")
+
+    def _publish(self, data):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT INTO socketio_messages (channel, created_at, payload) VALUES (?, ?, ?)",
+                               (self.channel, now, json.dumps(data)))
+            self._published += 1
+            if self._published % PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM socketio_messages WHERE created_at < ?",
+                                   (now - RETENTION_SECONDS,))
+
+    def _listen(self):
+        # Starts after the newest row, so a worker that comes up late does
+        # not replay old emits.
+        with self._lock:
+            last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM socketio_messages").fetchone()[0]
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT id, payload FROM socketio_messages "
+                                          "WHERE id > ? AND channel = ? ORDER BY id",
+                                          (last_id, self.channel)).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                yield json.loads(payload)
+            if not rows:
+                self.server.sleep(self.poll_interval)
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BACKEND_DIR), 'shared'))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Config and utils read their settings at import time, so point them at
+    # a temporary media folder before the app is imported.
+    from config import Config
+    monkeypatch.setattr(Config, 'MEDIA_FOLDER', str(tmp_path / 'media'))
+    monkeypatch.setattr(Config, 'SNAPSHOTS_FOLDER', str(tmp_path / 'media' / 'snapshots'))
+    monkeypatch.setattr(Config, 'VIDEOS_FOLDER', str(tmp_path / 'media' / 'videos'))
+
+    class TestConfig(Config):
+        TESTING = True
+        LOGIN_DISABLED = True
+        SECRET_KEY = 'test'
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        COOLDOWN_DB = ':memory:'
+        RESPONSE_CACHE_DB = None
+        SOCKETIO_MESSAGE_QUEUE = None
+
+    import utils
+    from evidence_store import EvidenceStore
+    monkeypatch.setattr(utils, 'evidence_store', EvidenceStore(str(tmp_path / 'media')))
+
+    from app import create_app
+    from extensions import db
+    app = create_app(TestConfig)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
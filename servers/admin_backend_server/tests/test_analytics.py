@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from extensions import db, response_cache
+from models import Incident, IncidentRollup
+
+DAY = datetime(2024, 5, 1)
+
+
+def add_incidents(count, **fields):
+    incidents = []
+    for i in range(count):
+        values = dict(source='CCTV', camera_id=f'CCTV-{i:02d}', lat=13.0 + i * 0.01, lng=80.2,
+                      occurred_at=DAY + timedelta(minutes=i), severity='high', status='new')
+        values.update(fields)
+        incidents.append(Incident(**values))
+    db.session.add_all(incidents)
+    db.session.commit()
+    return incidents
+
+
+def get(client, url):
+    response_cache.invalidate()
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_bucket_totals_do_not_grow_with_incidents(app):
+    with app.app_context():
+        add_incidents(20)
+        totals = IncidentRollup.query.filter_by(granularity='day', scope='total').all()
+        statuses = IncidentRollup.query.filter_by(granularity='day', scope='status').all()
+        full = IncidentRollup.query.filter_by(granularity='day', scope='all').count()
+
+    assert [(r.bucket, r.incident_count) for r in totals] == [(DAY, 20)]
+    assert [(r.status, r.incident_count) for r in statuses] == [('new', 20)]
+    # One camera and cell each, so the full key is per incident here.
+    assert full == 20
+
+
+def test_timeseries_reads_matching_scope(app):
+    client = app.test_client()
+    with app.app_context():
+        incidents = add_incidents(5)
+        add_incidents(2, source='MOBILE', camera_id=None)
+        incidents[0].status = 'resolved'
+        db.session.delete(incidents[1])
+        db.session.commit()
+
+    window = f'granularity=day&start={DAY.isoformat()}&end={DAY.isoformat()}'
+    body = get(client, f'/api/analytics/timeseries?{window}')
+    assert [(s['key'], s['total']) for s in body['series']] == [('total', 6)]
+
+    body = get(client, f'/api/analytics/timeseries?{window}&group_by=status')
+    assert {s['key']: s['total'] for s in body['series']} == {'new': 5, 'resolved': 1}
+
+    body = get(client, f'/api/analytics/timeseries?{window}&group_by=status&source=CCTV')
+    assert {s['key']: s['total'] for s in body['series']} == {'new': 3, 'resolved': 1}
+
+    body = get(client, f'/api/analytics/heatmap?{window}&precision=3')
+    assert body['total'] == 6
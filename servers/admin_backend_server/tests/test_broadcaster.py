@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from broadcaster import IncidentBroadcaster
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emits = []
+        self.tasks = []
+
+    def start_background_task(self, target):
+        self.tasks.append(target)
+
+    def sleep(self, seconds):
+        pass
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.emits.append((event, data, to))
+
+
+def incident(incident_id, status='new', source='CCTV', geohash='tdr1vabcd'):
+    return SimpleNamespace(id=incident_id, status=status, source=source, geohash=geohash)
+
+
+def test_burst_is_one_emit_per_room_set():
+    socketio = RecordingSocketIO()
+    broadcaster = IncidentBroadcaster(socketio)
+
+    broadcaster.publish_update(incident(1), {'status': 'new'})
+    broadcaster.publish_update(incident(2), {'status': 'new'})
+    broadcaster.publish_update(incident(1), {'severity': 'high'})
+    broadcaster.publish_update(incident(3, geohash='u4pruydqq'), {'status': 'new'})
+
+    assert len(socketio.tasks) == 1
+    socketio.tasks[0]()
+
+    assert len(socketio.emits) == 2
+    (event, same_cell, rooms), (_, other_cell, other_rooms) = socketio.emits
+    assert event == 'incident_updates'
+    assert same_cell == [{'status': 'new', 'severity': 'high', 'id': 1}, {'status': 'new', 'id': 2}]
+    assert other_cell == [{'status': 'new', 'id': 3}]
+    # One emit addresses every matching room, so a client in several of
+    # them still gets each entry once.
+    assert rooms == ['all', 'cell:tdr', 'cell:tdr1', 'cell:tdr1v', 'source:CCTV', 'status:new']
+    assert 'cell:u4p' in other_rooms
+
+
+def test_update_also_reaches_previous_status_room():
+    socketio = RecordingSocketIO()
+    broadcaster = IncidentBroadcaster(socketio)
+
+    broadcaster.publish_update(incident(1, status='acknowledged'), {'status': 'acknowledged'},
+                               previous_status='new')
+    socketio.tasks[0]()
+
+    [(_, _, rooms)] = socketio.emits
+    assert 'status:new' in rooms and 'status:acknowledged' in rooms
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from extensions import db, response_cache
+from models import Incident, Media, MobileReport, User, ActionLog
+
+
+def add_incidents(count):
+    now = datetime.utcnow()
+    user = User.query.first()
+    if user is None:
+        user = User(username='operator')
+        user.set_password('operator123')
+        db.session.add(user)
+        db.session.flush()
+    for i in range(count):
+        report = MobileReport(user_id=f'user-{i}', lat=13.0, lng=80.2, timestamp=now)
+        db.session.add(report)
+        db.session.flush()
+        incident = Incident(source='MOBILE', mobile_report_id=report.id, lat=13.0 + i * 0.001, lng=80.2,
+                            occurred_at=now - timedelta(minutes=i), status='new')
+        db.session.add(incident)
+        db.session.flush()
+        db.session.add(Media(incident_id=incident.id, media_type='snapshot', file_path=f'snapshots/{i}.jpg'))
+        db.session.add(ActionLog(incident_id=incident.id, user_id=user.id, action_type='acknowledge'))
+    db.session.commit()
+    return incident.id
+
+
+def count_queries(client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    response_cache.invalidate()
+    db.session.expire_all()
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+def test_list_query_count_does_not_grow_with_results(app):
+    client = app.test_client()
+    with app.app_context():
+        add_incidents(1)
+        one, body = count_queries(client, '/api/incidents')
+        assert len(body['incidents']) == 1
+
+        add_incidents(24)
+        many, body = count_queries(client, '/api/incidents')
+        assert len(body['incidents']) == 25
+        assert body['incidents'][0]['media'] and body['incidents'][0]['mobile_report']
+
+    assert many == one
+
+
+def test_detail_query_count_does_not_grow_with_related_rows(app):
+    client = app.test_client()
+    with app.app_context():
+        incident_id = add_incidents(1)
+        one, _ = count_queries(client, f'/api/incidents/{incident_id}')
+
+        user = User.query.first()
+        for _ in range(10):
+            db.session.add(Media(incident_id=incident_id, media_type='snapshot', file_path='snapshots/x.jpg'))
+            db.session.add(ActionLog(incident_id=incident_id, user_id=user.id, action_type='dispatch'))
+        db.session.commit()
+        many, body = count_queries(client, f'/api/incidents/{incident_id}')
+        assert len(body['action_logs']) == 11
+
+    assert many == one
@@ -0,0 +1,55 @@
+import io
+import os
+
+import utils
+from models import Incident
+
+
+def cctv_report(**extra):
+    return dict({
+        'camera_id': 'CCTV-01',
+        'lat': '13.0583',
+        'lng': '80.2571',
+        'occurred_at': '2020-01-01T00:00:00',
+        'confidence': '91.0',
+        'snapshot': (io.BytesIO(b'not really a jpeg'), 'snapshot.jpg'),
+    }, **extra)
+
+
+def test_report_is_stored_with_its_evidence(app):
+    client = app.test_client()
+    response = client.post('/api/accidents/report', data=cctv_report(), content_type='multipart/form-data')
+    assert response.status_code == 201
+
+    with app.app_context():
+        incident = Incident.query.get(response.get_json()['incident_id'])
+        assert incident.occurred_at.isoformat() == '2020-01-01T00:00:00'
+        [media] = incident.media
+        assert os.path.exists(utils.get_media_full_path(media.file_path))
+
+
+def test_failed_evidence_write_fails_the_report(app, monkeypatch):
+    def failing_write(relative_path, write, cleanup):
+        if cleanup:
+            cleanup()
+        raise OSError('disk full')
+
+    monkeypatch.setattr(utils.evidence_store, '_write', failing_write)
+    client = app.test_client()
+    response = client.post('/api/accidents/report', data=cctv_report(), content_type='multipart/form-data')
+
+    # A 5xx makes the gateway keep the alert and retry it.
+    assert response.status_code == 500
+    with app.app_context():
+        assert Incident.query.count() == 0
+
+
+def test_merged_report_keeps_every_camera(app):
+    client = app.test_client()
+    response = client.post('/api/accidents/report', data=cctv_report(camera_ids='CCTV-01,CCTV-02'),
+                           content_type='multipart/form-data')
+    assert response.status_code == 201
+
+    incident = client.get(f"/api/incidents/{response.get_json()['incident_id']}").get_json()
+    assert incident['camera_id'] == 'CCTV-01'
+    assert incident['camera_ids'] == ['CCTV-01', 'CCTV-02']
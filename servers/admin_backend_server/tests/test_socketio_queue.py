@@ -0,0 +1,100 @@
+import io
+import multiprocessing
+import time
+
+import requests
+import socketio
+
+from extensions import db
+from models import User
+
+DELIVERY_TIMEOUT = 5.0
+STARTUP_TIMEOUT = 60.0
+
+
+def serve_app(tmp_path, database_uri, ports):
+    # One backend worker process. extensions.socketio is a module singleton,
+    # so each app needs a process of its own, as in production.
+    from config import Config
+    Config.MEDIA_FOLDER = str(tmp_path / 'media')
+    Config.SNAPSHOTS_FOLDER = str(tmp_path / 'media' / 'snapshots')
+    Config.VIDEOS_FOLDER = str(tmp_path / 'media' / 'videos')
+
+    import utils
+    from evidence_store import EvidenceStore
+    utils.evidence_store = EvidenceStore(Config.MEDIA_FOLDER)
+
+    class WorkerConfig(Config):
+        SECRET_KEY = 'test'
+        SQLALCHEMY_DATABASE_URI = database_uri
+        COOLDOWN_DB = ':memory:'
+        RESPONSE_CACHE_DB = None
+        SOCKETIO_MESSAGE_QUEUE = f"sqlite:///{tmp_path / 'socketio_queue.db'}"
+        SOCKETIO_BATCH_WINDOW = 0.05
+
+    from werkzeug.serving import make_server
+    from app import create_app
+    server = make_server('127.0.0.1', 0, create_app(WorkerConfig), threaded=True)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def connect_client(url):
+    # Logged in through the API; the connect handler refuses anonymous sockets.
+    session = requests.Session()
+    response = session.post(f'{url}/api/auth/login', json={'username': 'operator', 'password': 'operator123'})
+    assert response.status_code == 200
+    received = []
+    client = socketio.Client(http_session=session)
+    client.on('new_incidents', lambda incidents: received.extend(incidents))
+    client.connect(url, transports=['polling'])
+    return client, received
+
+
+def wait_for(condition):
+    deadline = time.time() + DELIVERY_TIMEOUT
+    while time.time() < deadline and not condition():
+        time.sleep(0.02)
+    return condition()
+
+
+def test_report_reaches_clients_on_every_worker(app, tmp_path):
+    with app.app_context():
+        user = User(username='operator')
+        user.set_password('operator123')
+        db.session.add(user)
+        db.session.commit()
+
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    workers = [context.Process(target=serve_app, args=(tmp_path, app.config['SQLALCHEMY_DATABASE_URI'], ports),
+                               daemon=True) for _ in range(2)]
+    clients = []
+    try:
+        for worker in workers:
+            worker.start()
+        urls = [f'http://127.0.0.1:{ports.get(timeout=STARTUP_TIMEOUT)}' for _ in workers]
+        clients = [connect_client(url) for url in urls]
+
+        response = requests.post(f'{urls[0]}/api/accidents/report', data={
+            'camera_id': 'CCTV-01', 'lat': '13.0583', 'lng': '80.2571',
+            'occurred_at': '2020-01-01T00:00:00', 'confidence': '91.0',
+        }, files={'snapshot': ('snapshot.jpg', io.BytesIO(b'not really a jpeg'), 'image/jpeg')})
+        assert response.status_code == 201
+        incident_id = response.json()['incident_id']
+
+        def deliveries(received):
+            return [incident for incident in received if incident['id'] == incident_id]
+
+        for i, (_, received) in enumerate(clients):
+            assert wait_for(lambda: deliveries(received)), f'client on worker {i} got no new_incidents'
+        # Leave time for a duplicate to show up before checking for one.
+        time.sleep(0.5)
+        for _, received in clients:
+            assert len(deliveries(received)) == 1
+    finally:
+        for client, _ in clients:
+            client.disconnect()
+        for worker in workers:
+            worker.terminate()
+            worker.join()
@@ -1,8 +1,8 @@
+import base64
 import os
-import uuid
-from datetime import datetime
-from werkzeug.utils import secure_filename
+from datetime import datetime, timezone
 from config import Config
+from evidence_store import EvidenceStore
 
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'webm'}
@@ -21,6 +21,11 @@ def allowed_file(filename, file_type='image'):
     return False
 
 
+# Uploads are content-addressed under media/snapshots and media/videos and
+# written to disk off the request thread.
+evidence_store = EvidenceStore(Config.MEDIA_FOLDER)
+
+
 def save_media_file(file, media_type='snapshot'):
     if not file or file.filename == '':
         return None
@@ -30,24 +35,55 @@ def save_media_file(file, media_type='snapshot'):
         return None
     
     ext = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{uuid.uuid4().hex}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{ext}"
-    filename = secure_filename(filename)
-    
-    if media_type == 'snapshot':
-        folder = Config.SNAPSHOTS_FOLDER
-        relative_path = f"snapshots/{filename}"
-    else:
-        folder = Config.VIDEOS_FOLDER
-        relative_path = f"videos/{filename}"
+    prefix = 'snapshots' if media_type == 'snapshot' else 'videos'
     
     try:
-        filepath = os.path.join(folder, filename)
-        file.save(filepath)
-        return relative_path
+        return evidence_store.put_stream(file.stream, ext, prefix)
     except Exception as e:
         print(f"Error saving file: {e}")
         return None
 
 
+def wait_for_media(relative_paths):
+    # Fails the request if a background write failed, before its Media rows
+    # are committed, so the sender retries. Once this returns the files are on
+    # disk for every worker, not just this one.
+    for relative_path in relative_paths:
+        if not os.path.exists(evidence_store.path(relative_path)):
+            raise OSError(f"Evidence file was not written: {relative_path}")
+
+
 def get_media_full_path(relative_path):
-    return os.path.join(Config.MEDIA_FOLDER, relative_path)
\ No newline at end of file
+    # Waits for the background write if the file was only just uploaded.
+    return evidence_store.path(relative_path)
+
+
+def get_thumbnail_full_path(relative_path):
+    return evidence_store.thumbnail(relative_path)
+
+
+def parse_utc_timestamp(value):
+    # ISO 8601 -> naive UTC, the form every DateTime column is stored in.
+    # Naive input is taken as UTC already (the edge and gateway send utcnow()).
+    # Returns None when the value cannot be parsed.
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def encode_cursor(created_at, incident_id):
+    raw = f"{created_at.isoformat()}|{incident_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    # Raises ValueError for anything that is not a cursor we issued.
+    try:
+        created_at, incident_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(incident_id)
+    except (UnicodeError, TypeError, base64.binascii.Error) as e:
+        raise ValueError(f'Invalid cursor: {e}')
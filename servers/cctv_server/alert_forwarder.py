@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from alert_outbox import AlertOutbox, OUTBOX_PATH
+
+FORWARD_WORKERS = 4
+BATCH_SIZE = 20
+MAX_BATCH_BYTES = 20 * 1024 * 1024  # well under the backend's 50 MB MAX_CONTENT_LENGTH
+POLL_INTERVAL = 1.0
+REQUEST_TIMEOUT = (3, 15)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 300.0
+
+
+def backoff(attempts):
+    # Capped exponent: a long outage must not overflow the float.
+    return min(BACKOFF_BASE * 2 ** min(attempts, 32), BACKOFF_MAX)
+
+
+def bulk_url(url):
+    return url.rstrip('/') + '/bulk'
+
+
+def merge_clusters(alerts):
+    # One report per correlation cluster (uncorrelated alerts stand alone).
+    # The most confident camera provides the location; the report gets the
+    # earliest occurred_at, the highest severity and every camera's evidence.
+    clusters = {}
+    for alert in alerts:
+        key = alert["cluster_id"] if alert.get("cluster_id") is not None else f"alert-{alert['id']}"
+        clusters.setdefault(key, []).append(alert)
+
+    reports = []
+    for members in clusters.values():
+        primary = max(members, key=lambda a: float(a["form"].get('confidence') or 0))
+        form = dict(primary["form"])
+        if len(members) > 1:
+            form['occurred_at'] = min(a["form"]['occurred_at'] for a in members)
+            if any(a["form"].get('severity') == 'high' for a in members):
+                form['severity'] = 'high'
+            form['camera_ids'] = ','.join(sorted({a["form"]['camera_id'] for a in members}))
+            print(f"🔗 Merged {len(members)} alerts from {form['camera_ids']} into one report")
+        reports.append({"ref": str(min(a["id"] for a in members)), "ids": [a["id"] for a in members],
+                        "form": form, "alerts": members})
+    return reports
+
+
+class AlertForwarder:
+    # Alerts are acknowledged to the camera as soon as they are in the outbox;
+    # a fixed pool of workers then posts them to the admin backend over one
+    # keep-alive session, so at most `workers` requests are in flight no matter
+    # how slow the dashboard is. A worker that finds more than one alert due
+    # sends them together to the bulk endpoint. Failed sends stay in the
+    # outbox with exponential backoff, so delivery is at-least-once. With a
+    # correlation window, alerts from nearby cameras are held that long and
+    # forwarded as one merged report.
+
+    def __init__(self, url, outbox_path=OUTBOX_PATH, workers=FORWARD_WORKERS,
+                 batch_size=BATCH_SIZE, timeout=REQUEST_TIMEOUT, resolve_path=None,
+                 correlation_window=0, correlation_radius=0, max_batch_bytes=MAX_BATCH_BYTES):
+        # resolve_path maps a stored evidence path to a readable file, waiting
+        # for the evidence store's background write if needed.
+        self.url = url
+        self.resolve_path = resolve_path or (lambda path: path)
+        self.bulk_url = bulk_url(url)
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.correlation_window = correlation_window
+        self.correlation_radius = correlation_radius
+        self.timeout = timeout
+        self.forwarded = 0
+        self.dropped = 0
+        self.outbox = AlertOutbox(outbox_path)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._bulk_supported = True
+        self._failing = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f"alert-forwarder-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, form_data, snapshot_path, video_path=None):
+        # Returns (alert_id, cluster_id); cluster_id is None without correlation.
+        ids = self.outbox.add(form_data, snapshot_path, video_path, self.correlation_window, self.correlation_radius)
+        self._wake.set()
+        return ids
+
+    def backlog(self):
+        return self.outbox.backlog()
+
+    def close(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.session.close()
+        self.outbox.close()
+
+    def _open_files(self, report, suffix=''):
+        # A merged report carries one snapshot (and clip) part per camera.
+        files = []
+        for alert in report["alerts"]:
+            files.append((f'snapshot{suffix}', (os.path.basename(alert["snapshot_path"]),
+                                                open(self.resolve_path(alert["snapshot_path"]), 'rb'),
+                                                'image/jpeg')))
+            if alert["video_path"]:
+                files.append((f'video{suffix}', (os.path.basename(alert["video_path"]),
+                                                 open(self.resolve_path(alert["video_path"]), 'rb'),
+                                                 'video/mp4')))
+        return files
+
+    def _post(self, url, data, reports, suffixes):
+        files = []
+        try:
+            for report, suffix in zip(reports, suffixes):
+                files += self._open_files(report, suffix)
+            return self.session.post(url, data=data, files=files, timeout=self.timeout)
+        finally:
+            for _, (_, handle, _) in files:
+                handle.close()
+
+    def _send_one(self, report):
+        # Returns the ids that are finished (accepted or rejected for good).
+        response = self._post(self.url, report["form"], [report], [''])
+        if response.status_code in [200, 201]:
+            return report["ids"], []
+        if response.status_code < 500:
+            print(f"❌ Admin Backend rejected alert {report['ref']}: {response.status_code} - {response.text[:200]}")
+            return [], report["ids"]
+        raise requests.HTTPError(f"Admin Backend Error: {response.status_code} - {response.text[:200]}")
+
+    def _send_bulk(self, reports):
+        by_ref = {report["ref"]: report for report in reports}
+        payload = [dict(report["form"], ref=report["ref"]) for report in reports]
+        response = self._post(self.bulk_url, {'reports': json.dumps(payload)}, reports,
+                              [f'_{report["ref"]}' for report in reports])
+        if response.status_code in (404, 405):
+            # Older backend without the bulk endpoint.
+            self._bulk_supported = False
+            print("⚠️ Admin Backend has no bulk endpoint, forwarding alerts one by one")
+            return self._send_each(reports)
+        if response.status_code == 413:
+            print(f"⚠️ Admin Backend refused a {len(reports)}-report batch as too large, sending one by one")
+            return self._send_each(reports)
+        if response.status_code not in [200, 201]:
+            raise requests.HTTPError(f"Admin Backend Error: {response.status_code} - {response.text[:200]}")
+
+        accepted, rejected = [], []
+        for result in response.json().get('results', []):
+            report = by_ref.get(str(result.get('ref')))
+            if report is None:
+                continue
+            if 'incident_id' in result:
+                accepted += report["ids"]
+            else:
+                print(f"❌ Admin Backend rejected alert {result['ref']}: {result.get('error')}")
+                rejected += report["ids"]
+        return accepted, rejected
+
+    def _send_each(self, reports):
+        accepted, rejected = [], []
+        for report in reports:
+            ok, bad = self._send_one(report)
+            accepted += ok
+            rejected += bad
+        return accepted, rejected
+
+    def _report_bytes(self, report):
+        size = 0
+        for alert in report["alerts"]:
+            for path in (alert["snapshot_path"], alert["video_path"]):
+                if path:
+                    try:
+                        size += os.path.getsize(self.resolve_path(path))
+                    except OSError:
+                        pass
+        return size
+
+    def _chunks(self, reports):
+        # Splits reports into requests of at most max_batch_bytes of evidence;
+        # a report larger than that on its own is sent alone.
+        chunk, chunk_bytes = [], 0
+        for report in reports:
+            size = self._report_bytes(report)
+            if chunk and chunk_bytes + size > self.max_batch_bytes:
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(report)
+            chunk_bytes += size
+        if chunk:
+            yield chunk
+
+    def _forward(self, alerts):
+        lost = [a["id"] for a in alerts if not os.path.exists(self.resolve_path(a["snapshot_path"]))]
+        for alert_id in lost:
+            print(f"❌ Evidence for alert {alert_id} is gone, dropping it")
+        alerts = [a for a in alerts if a["id"] not in lost]
+        if not alerts:
+            return [], lost
+        accepted, rejected = [], list(lost)
+        for chunk in self._chunks(merge_clusters(alerts)):
+            try:
+                if len(chunk) > 1 and self._bulk_supported:
+                    ok, bad = self._send_bulk(chunk)
+                else:
+                    ok, bad = self._send_each(chunk)
+            except (requests.RequestException, OSError, ValueError):
+                if len(accepted) + len(rejected) == len(lost):
+                    raise
+                # Keep what was delivered; the rest is retried by _run.
+                break
+            accepted += ok
+            rejected += bad
+        return accepted, rejected
+
+    def _wait(self):
+        due = self.outbox.next_due()
+        timeout = POLL_INTERVAL if due is None else min(POLL_INTERVAL, max(0.0, due - time.time()))
+        self._wake.wait(timeout)
+        self._wake.clear()
+
+    def _run(self):
+        while not self._stop.is_set():
+            alerts = self.outbox.claim(self.batch_size)
+            if not alerts:
+                self._wait()
+                continue
+
+            started = time.time()
+            try:
+                accepted, rejected = self._forward(alerts)
+            except (requests.RequestException, OSError, ValueError) as e:
+                delay = backoff(min(a["attempts"] for a in alerts))
+                print(f"❌ Forward of {len(alerts)} alert(s) failed: {e} (retry in {delay:.0f}s, "
+                      f"{self.outbox.backlog()} in outbox)")
+                self.outbox.retry([a["id"] for a in alerts], delay)
+                self._failing = True
+                continue
+
+            if self._failing:
+                self._failing = False
+                self.outbox.expedite()
+                self._wake.set()
+
+            finished = set(accepted) | set(rejected)
+            self.outbox.done(list(finished))
+            # Anything the backend did not answer for is tried again, backing
+            # off the same way as a failed request.
+            missing = {}
+            for alert in alerts:
+                if alert["id"] not in finished:
+                    missing.setdefault(backoff(alert["attempts"]), []).append(alert["id"])
+            for delay, ids in missing.items():
+                self.outbox.retry(ids, delay)
+            self.forwarded += len(accepted)
+            self.dropped += len(rejected)
+            if accepted:
+                print(f"✅ Admin Dashboard updated with {len(accepted)} alert(s) "
+                      f"({(time.time() - started) * 1000:.0f} ms)")
@@ -0,0 +1,148 @@
+import json
+import math
+import sqlite3
+import threading
+import time
+
+from geo import METERS_PER_DEGREE, haversine_m
+
+OUTBOX_PATH = "alert_outbox.db"
+CLAIM_LEASE = 120
+
+
+class AlertOutbox:
+    # Every accepted alert is a row in a WAL-mode SQLite table until the admin
+    # backend has taken it. Claimed rows are leased rather than removed, so an
+    # alert that was in flight when the gateway died is sent again once the
+    # lease runs out.
+    #
+    # Alerts added with a hold are correlated here too: an alert joins the
+    # nearest held cluster within the radius, or starts one held for `hold`
+    # seconds. All members share the cluster's release time and are forwarded
+    # together as one report. Because the held rows are the index, every
+    # gateway worker sharing the file sees the same clusters.
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                form_json TEXT NOT NULL,
+                snapshot_path TEXT NOT NULL,
+                video_path TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                leased_until REAL NOT NULL DEFAULT 0
+            )""")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        for column, ddl in (("cluster_id", "INTEGER"), ("held_until", "REAL NOT NULL DEFAULT 0"),
+                            ("lat", "REAL"), ("lng", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {ddl}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_held ON outbox (held_until)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_cluster ON outbox (cluster_id)")
+
+    def add(self, form_data, snapshot_path, video_path=None, hold=0, radius_m=0):
+        # Returns (alert_id, cluster_id).
+        now = time.time()
+        lat, lng = form_data.get('lat'), form_data.get('lng')
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cluster = self._open_cluster(now, lat, lng, radius_m) if hold > 0 else None
+                held_until = cluster[1] if cluster else (now + hold if hold > 0 else 0)
+                cur = self._conn.execute(
+                    "INSERT INTO outbox (created_at, form_json, snapshot_path, video_path, next_attempt_at, "
+                    "cluster_id, held_until, lat, lng) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now, json.dumps(form_data), snapshot_path, video_path, max(now, held_until),
+                     cluster[0] if cluster else None, held_until, lat, lng))
+                alert_id = cur.lastrowid
+                if hold > 0 and not cluster:
+                    self._conn.execute("UPDATE outbox SET cluster_id = ? WHERE id = ?", (alert_id, alert_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return alert_id, cluster[0] if cluster else (alert_id if hold > 0 else None)
+
+    def _open_cluster(self, now, lat, lng, radius_m):
+        # Nearest still-held alert within radius_m, found with a bounding box
+        # over the few rows that are currently held.
+        if lat is None or lng is None:
+            return None
+        dlat = radius_m / METERS_PER_DEGREE
+        dlng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        rows = self._conn.execute(
+            "SELECT cluster_id, held_until, lat, lng FROM outbox WHERE held_until > ? "
+            "AND lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?",
+            (now, lat - dlat, lat + dlat, lng - dlng, lng + dlng)).fetchall()
+        best = None
+        for cluster_id, held_until, row_lat, row_lng in rows:
+            distance = haversine_m(lat, lng, row_lat, row_lng)
+            if distance <= radius_m and (best is None or distance < best[0]):
+                best = (distance, cluster_id, held_until)
+        return best[1:] if best else None
+
+    def claim(self, limit, lease=CLAIM_LEASE):
+        # Oldest due rows first, leased so other workers skip them while this
+        # one is sending. Clusters are never split across claims.
+        now = time.time()
+        columns = "id, form_json, snapshot_path, video_path, attempts, cluster_id"
+        due = "next_attempt_at <= ? AND leased_until <= ?"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(f"SELECT {columns} FROM outbox WHERE {due} ORDER BY id LIMIT ?",
+                                          (now, now, limit)).fetchall()
+                clusters = sorted({r[5] for r in rows if r[5] is not None})
+                if clusters:
+                    seen = {r[0] for r in rows}
+                    rows += [r for r in self._conn.execute(
+                        f"SELECT {columns} FROM outbox WHERE {due} AND cluster_id IN "
+                        f"({','.join('?' * len(clusters))}) ORDER BY id", [now, now] + clusters)
+                        if r[0] not in seen]
+                self._conn.executemany("UPDATE outbox SET leased_until = ? WHERE id = ?",
+                                       [(now + lease, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{"id": r[0], "form": json.loads(r[1]), "snapshot_path": r[2],
+                 "video_path": r[3], "attempts": r[4], "cluster_id": r[5]} for r in rows]
+
+    def done(self, ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def retry(self, ids, delay):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, leased_until = 0 WHERE id = ?",
+                [(time.time() + delay, i) for i in ids])
+
+    def expedite(self):
+        # Called once the backend answers again, so rows waiting out their
+        # backoff are drained straight away instead of one by one.
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE outbox SET next_attempt_at = ? WHERE next_attempt_at > ? AND held_until <= ?",
+                               (now, now, now))
+
+    def backlog(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def next_due(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(MAX(next_attempt_at, leased_until)) FROM outbox").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,11 +1,18 @@
 from flask import Flask, request, jsonify
 import datetime
-import time
 import os
+import sys
 import cv2
 import numpy as np
 import base64
-import requests
+import sqlite3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+from alert_forwarder import AlertForwarder
+from camera_registry import CameraRegistry
+from cooldown_store import open_cooldown_store
+from evidence_store import EvidenceStore
 
 app = Flask(__name__)
 
@@ -13,77 +20,147 @@ app = Flask(__name__)
 ADMIN_BACKEND_URL = "http://127.0.0.1:5000/api/accidents/report"
 
 EVIDENCE_DIR = "accident_evidence"
-os.makedirs(EVIDENCE_DIR, exist_ok=True)
+evidence = EvidenceStore(EVIDENCE_DIR)
+
+# Metadata headers for raw image/jpeg alerts.
+METADATA_HEADERS = {
+    'camera_id': 'X-Camera-Id',
+    'confidence': 'X-Confidence',
+    'occurred_at': 'X-Occurred-At',
+    'location': 'X-Location',
+}
+
+# Alerts from cameras within CORRELATION_RADIUS_M of each other that arrive
+# within CORRELATION_WINDOW seconds of the first are sent as one report.
+# A window of 0 forwards every alert on its own, immediately.
+CORRELATION_WINDOW = float(os.getenv("CORRELATION_WINDOW", 5))
+CORRELATION_RADIUS_M = float(os.getenv("CORRELATION_RADIUS_M", 500))
+
+forwarder = AlertForwarder(ADMIN_BACKEND_URL, resolve_path=evidence.path,
+                           correlation_window=CORRELATION_WINDOW, correlation_radius=CORRELATION_RADIUS_M)
 
 
-last_alert_times = {}
 ALERT_COOLDOWN = 300
+# Shared by every gateway worker on the host; ":memory:" for a single process.
+COOLDOWN_DB = os.getenv("COOLDOWN_DB", "gateway_cooldowns.db")
+cooldowns = open_cooldown_store(COOLDOWN_DB)
+
+# Location, threshold and cooldown per camera; edits are picked up without a restart.
+CAMERA_REGISTRY = os.getenv("CAMERA_REGISTRY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cameras.json"))
+cameras = CameraRegistry(CAMERA_REGISTRY)
+# Seconds an unregistered camera is asked to wait before resending.
+UNKNOWN_CAMERA_RETRY_AFTER = 60
+
+def alert_metadata():
+    # Alerts arrive as raw image/jpeg (metadata in X- headers), multipart
+    # (metadata in form fields, snapshot/video as file parts) or the original
+    # JSON with base64 image/video.
+    if request.mimetype == 'image/jpeg':
+        return {key: request.headers.get(header) for key, header in METADATA_HEADERS.items()
+                if request.headers.get(header) is not None}
+    if request.mimetype == 'multipart/form-data':
+        return request.form
+    return request.get_json(silent=True) or {}
+
+
+def save_evidence(data, field):
+    # Returns the evidence store path, or None if the alert has no such part.
+    # File parts and raw bodies are hashed in chunks; only the legacy JSON
+    # format has to be base64-decoded in memory.
+    ext, prefix = ('jpg', 'snapshots') if field == 'image' else ('mp4', 'videos')
+    if request.mimetype == 'image/jpeg':
+        return evidence.put_stream(request.stream, ext, prefix) if field == 'image' else None
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('snapshot' if field == 'image' else field)
+        if not upload or not upload.filename:
+            return None
+        return evidence.put_stream(upload.stream, ext, prefix)
+    if not data.get(field):
+        return None
+    return evidence.put_bytes(base64.b64decode(data[field]), ext, prefix)
 
-CAMERA_LOCATIONS = {
-    "CCTV-01": {"lat": 12.9229, "lng": 80.1275},
-    "CCTV-02": {"lat": 28.7041, "lng": 77.1025},
-    "DEFAULT": {"lat": 0.0, "lng": 0.0}
-}
 
 @app.route('/alert', methods=['POST'])
 def receive_alert():
-    data = request.json
+    data = alert_metadata()
     camera_id = data.get('camera_id', 'Unknown')
     confidence = float(data.get('confidence', 0))
     
     print(f"\n📨 Signal Received from {camera_id} (Conf: {confidence}%)")
 
-    current_time = time.time()
-    last_time = last_alert_times.get(camera_id, 0)
-    
-    if (current_time - last_time) < ALERT_COOLDOWN:
-        print(f"⏳ SKIPPING: Alert suppressed (Cooldown active for {int(ALERT_COOLDOWN - (current_time - last_time))}s)")
+    camera = cameras.get(camera_id)
+    if camera is None:
+        # Unregistered cameras used to be filed at (0, 0). Refuse the alert
+        # without rejecting it: the camera keeps it and resends, and it goes
+        # through once the camera is added to the registry.
+        print(f"❌ Unknown camera {camera_id}, add it to {CAMERA_REGISTRY}")
+        return jsonify({"error": f"Unknown camera {camera_id}"}), 503, \
+            {"Retry-After": str(UNKNOWN_CAMERA_RETRY_AFTER)}
+
+    if camera.threshold is not None and confidence < camera.threshold * 100:
+        print(f"⏳ SKIPPING: {confidence}% is below the {camera.threshold * 100:.0f}% threshold for {camera_id}")
+        return jsonify({"status": "Skipped", "reason": "Below camera threshold"}), 200
+
+    acquired, remaining = cooldowns.try_acquire(camera_id, ALERT_COOLDOWN if camera.cooldown is None else camera.cooldown)
+    if not acquired:
+        print(f"⏳ SKIPPING: Alert suppressed (Cooldown active for {int(remaining)}s)")
         return jsonify({"status": "Skipped", "reason": "Cooldown active"}), 200
 
-    last_alert_times[camera_id] = current_time
-
-    image_data = data.get('image')
-    if not image_data:
+    local_filename = save_evidence(data, 'image')
+    if not local_filename:
+        cooldowns.release(camera_id)
         return jsonify({"error": "No image data"}), 400
-
-    img_bytes = base64.b64decode(image_data)
-    
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    local_filename = f"{EVIDENCE_DIR}/accident_{timestamp}.jpg"
-    with open(local_filename, "wb") as f:
-        f.write(img_bytes)
-    print(f"📸 Local backup saved: {local_filename}")
-
-    print(f"🚀 Forwarding to Admin Dashboard: {ADMIN_BACKEND_URL}...")
-    
+    print(f"📸 Local backup saved: {EVIDENCE_DIR}/{local_filename}")
+
+    video_filename = save_evidence(data, 'video')
+    if video_filename:
+        print(f"🎞️ Event clip saved: {EVIDENCE_DIR}/{video_filename}")
+
+    form_data = {
+        'camera_id': camera_id,
+        'lat': camera.lat,
+        'lng': camera.lng,
+        'occurred_at': data.get('occurred_at') or datetime.datetime.utcnow().isoformat(),
+        'confidence': confidence,
+        'severity': 'high' if confidence > 85 else 'medium'
+    }
+
+    # Another gateway worker may claim the alert as soon as it is in the
+    # outbox, and it cannot see this process's pending writes, so the
+    # evidence has to be on disk first.
+    try:
+        for filename in filter(None, (local_filename, video_filename)):
+            if not os.path.exists(evidence.path(filename)):
+                raise OSError(f"Evidence file was not written: {filename}")
+    except OSError as e:
+        cooldowns.release(camera_id)
+        print(f"❌ Could not store evidence: {e}")
+        return jsonify({"status": "Evidence Error", "error": str(e)}), 503
+
+    # The alert is durable once it is in the outbox; forwarding happens on the
+    # forwarder's workers, so the camera gets its answer without waiting for
+    # the admin backend.
+    try:
+        alert_id, cluster_id = forwarder.submit(form_data, local_filename, video_filename)
+    except sqlite3.Error as e:
+        cooldowns.release(camera_id)
+        print(f"❌ Could not write alert to outbox: {e}")
+        return jsonify({"status": "Outbox Error", "error": str(e)}), 503
+
+    print(f"🚀 Queued alert {alert_id} (cluster {cluster_id}) for Admin Dashboard: {ADMIN_BACKEND_URL}")
+    return jsonify({"status": "Accepted", "alert_id": alert_id, "cluster_id": cluster_id,
+                    "evidence": local_filename}), 202
+
+@app.route('/cameras/near', methods=['GET'])
+def cameras_near():
     try:
-        loc = CAMERA_LOCATIONS.get(camera_id, CAMERA_LOCATIONS["DEFAULT"])
-        
-        files = {
-            'snapshot': (f'alert_{timestamp}.jpg', img_bytes, 'image/jpeg')
-        }
-        
-        form_data = {
-            'camera_id': camera_id,
-            'lat': loc['lat'],
-            'lng': loc['lng'],
-            'occurred_at': datetime.datetime.utcnow().isoformat(),
-            'confidence': confidence,
-            'severity': 'high' if confidence > 85 else 'medium'
-        }
-
-        response = requests.post(ADMIN_BACKEND_URL, data=form_data, files=files)
-        
-        if response.status_code in [200, 201]:
-            print("✅ Admin Dashboard updated successfully!")
-            return jsonify({"status": "Forwarded", "backend_response": response.json()}), 201
-        else:
-            print(f"❌ Admin Backend Error: {response.status_code} - {response.text}")
-            return jsonify({"status": "Backend Failed", "error": response.text}), 500
-
-    except Exception as e:
-        print(f"❌ Connection Failed: {e}")
-        return jsonify({"status": "Connection Error", "error": str(e)}), 500
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius = float(request.args.get('radius', 1000))
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat, lng and optional radius (meters) required"}), 400
+    return jsonify({"cameras": [dict(camera._asdict(), distance_m=round(distance, 1))
+                                for camera, distance in cameras.within(lat, lng, radius)]}), 200
 
 @app.route('/')
 def home():
@@ -0,0 +1,122 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from geo import METERS_PER_DEGREE, haversine_m
+
+RELOAD_CHECK_INTERVAL = 2.0
+CELL_DEGREES = 0.01
+
+Camera = namedtuple("Camera", ["camera_id", "lat", "lng", "site", "threshold", "cooldown", "name"])
+
+
+def _cell(lat, lng):
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lng / CELL_DEGREES))
+
+
+def parse_cameras(raw):
+    # Accepts {"cameras": [...]} or a bare list of camera objects.
+    entries = raw.get("cameras", []) if isinstance(raw, dict) else raw
+    cameras = {}
+    for entry in entries:
+        camera = Camera(
+            camera_id=str(entry["camera_id"]),
+            lat=float(entry["lat"]),
+            lng=float(entry["lng"]),
+            site=entry.get("site"),
+            threshold=float(entry["threshold"]) if entry.get("threshold") is not None else None,
+            cooldown=float(entry["cooldown"]) if entry.get("cooldown") is not None else None,
+            name=entry.get("name"),
+        )
+        cameras[camera.camera_id] = camera
+    return cameras
+
+
+class CameraRegistry:
+    # Cameras are looked up in a dict and indexed in a lat/lng grid of
+    # CELL_DEGREES cells. The file's mtime is checked at most every
+    # RELOAD_CHECK_INTERVAL seconds; a changed file is parsed into new
+    # structures that replace the old ones in one assignment, so readers never
+    # see a half-loaded registry. A file that fails to parse leaves the
+    # previous cameras in place.
+
+    def __init__(self, path, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._state = ({}, {})
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload(force=True)
+
+    def reload(self, force=False):
+        with self._lock:
+            self._checked_at = time.time()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                if force:
+                    print(f"⚠️ Camera registry {self.path} not readable: {e}")
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path) as f:
+                    cameras = parse_cameras(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Remember the bad version so it is reported once, not on every check.
+                self._mtime = mtime
+                print(f"❌ Camera registry {self.path} not reloaded: {e}")
+                return False
+
+            grid = defaultdict(list)
+            for camera in cameras.values():
+                grid[_cell(camera.lat, camera.lng)].append(camera)
+            self._state = (cameras, dict(grid))
+            self._mtime = mtime
+        print(f"📷 Camera registry loaded: {len(cameras)} cameras from {self.path}")
+        return True
+
+    def _current(self):
+        if time.time() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._state
+
+    def get(self, camera_id):
+        return self._current()[0].get(camera_id)
+
+    def __contains__(self, camera_id):
+        return camera_id in self._current()[0]
+
+    def __len__(self):
+        return len(self._current()[0])
+
+    def cameras(self):
+        return list(self._current()[0].values())
+
+    def within(self, lat, lng, radius_m):
+        # Returns [(camera, distance_m)] nearest first, visiting only the grid
+        # cells that overlap the radius.
+        grid = self._current()[1]
+        dlat = radius_m / METERS_PER_DEGREE
+        dlng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        (lat0, lng0), (lat1, lng1) = _cell(lat - dlat, lng - dlng), _cell(lat + dlat, lng + dlng)
+
+        found = []
+        for i in range(lat0, lat1 + 1):
+            for j in range(lng0, lng1 + 1):
+                for camera in grid.get((i, j), ()):
+                    distance = haversine_m(lat, lng, camera.lat, camera.lng)
+                    if distance <= radius_m:
+                        found.append((camera, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def near(self, camera_id, radius_m):
+        camera = self.get(camera_id)
+        if camera is None:
+            return []
+        return [(c, d) for c, d in self.within(camera.lat, camera.lng, radius_m) if c.camera_id != camera_id]
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MAX_KEYS = 100000
+PURGE_EVERY = 256
+BUSY_TIMEOUT_MS = 5000
+
+
+class MemoryCooldownStore:
+    # Single-process store: an insertion-ordered dict under a lock, trimmed
+    # from the oldest end when entries expire or the key limit is hit.
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._expires = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, ttl, now=None):
+        # Returns (True, 0) and starts a cooldown of `ttl` seconds, or
+        # (False, seconds_left) if one is already running for `key`.
+        now = time.time() if now is None else now
+        with self._lock:
+            expires_at = self._expires.get(key)
+            if expires_at is not None and expires_at > now:
+                return False, expires_at - now
+            self._expires[key] = now + ttl
+            self._expires.move_to_end(key)
+            while self._expires:
+                oldest, oldest_expiry = next(iter(self._expires.items()))
+                if oldest_expiry > now and len(self._expires) <= self.max_keys:
+                    break
+                del self._expires[oldest]
+            return True, 0.0
+
+    def release(self, key):
+        with self._lock:
+            self._expires.pop(key, None)
+
+    def __len__(self):
+        return len(self._expires)
+
+    def close(self):
+        pass
+
+
+class SQLiteCooldownStore:
+    # Shared by every process that opens the same file. The check-and-set is a
+    # single conditional upsert on the primary key, so two workers racing for
+    # the same key cannot both acquire it. Expired rows are purged every
+    # PURGE_EVERY acquisitions, and the oldest ones beyond max_keys go with them.
+
+    def __init__(self, path, max_keys=MAX_KEYS):
+        self.path = path
+        self.max_keys = max_keys
+        self._ops = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=BUSY_TIMEOUT_MS / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cooldowns "
+                           "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL) WITHOUT ROWID")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cooldowns_expiry ON cooldowns (expires_at)")
+
+    def try_acquire(self, key, ttl, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO cooldowns (key, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE cooldowns.expires_at <= ?",
+                (key, now + ttl, now))
+            acquired = cur.rowcount == 1
+            if not acquired:
+                row = self._conn.execute("SELECT expires_at FROM cooldowns WHERE key = ?", (key,)).fetchone()
+            self._ops += 1
+            if self._ops % PURGE_EVERY == 0:
+                self._purge(now)
+        if acquired:
+            return True, 0.0
+        return False, max(0.0, row[0] - now) if row else 0.0
+
+    def _purge(self, now):
+        self._conn.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM cooldowns WHERE key IN (SELECT key FROM cooldowns ORDER BY expires_at "
+            "LIMIT MAX(0, (SELECT COUNT(*) FROM cooldowns) - ?))", (self.max_keys,))
+
+    def release(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cooldowns WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cooldowns").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_cooldown_store(location, max_keys=MAX_KEYS):
+    # ":memory:" gives a per-process store; anything else is a SQLite file
+    # shared by all workers on the host.
+    if not location or location == ":memory:":
+        return MemoryCooldownStore(max_keys)
+    return SQLiteCooldownStore(location, max_keys)
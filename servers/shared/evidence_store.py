@@ -0,0 +1,144 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+WRITE_WORKERS = 2
+STREAM_CHUNK = 64 * 1024
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+THUMB_WIDTH = 320
+THUMB_QUALITY = 75
+THUMB_SUFFIX = ".thumb.jpg"
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
+
+
+def thumbnail_relpath(relative_path):
+    return os.path.splitext(relative_path)[0] + THUMB_SUFFIX
+
+
+def make_thumbnail(src_path, dst_path, width=THUMB_WIDTH, quality=THUMB_QUALITY):
+    # Images are decoded directly; for videos the first frame is used.
+    ext = src_path.rsplit('.', 1)[-1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        frame = cv2.imread(src_path)
+    else:
+        cap = cv2.VideoCapture(src_path)
+        ok, frame = cap.read()
+        cap.release()
+        frame = frame if ok else None
+    if frame is None:
+        return False
+    height, src_width = frame.shape[:2]
+    if src_width > width:
+        frame = cv2.resize(frame, (width, int(height * width / src_width)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        return False
+    tmp = dst_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(buffer.tobytes())
+    os.replace(tmp, dst_path)
+    return True
+
+
+class EvidenceStore:
+    # Blobs are stored under <root>/<prefix>/<h[:2]>/<h[2:4]>/<sha256>.<ext>,
+    # so identical uploads share one file and names never collide. The caller
+    # hashes the bytes and gets the relative path back at once; writing the
+    # file and its thumbnail happens on a small thread pool. path() waits for
+    # a pending write, so a blob can be read as soon as put() has returned.
+
+    def __init__(self, root, workers=WRITE_WORKERS, thumbnails=True):
+        self.root = root
+        self.thumbnails = thumbnails
+        self.tmp_dir = os.path.join(root, ".tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evidence-writer")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def relpath(self, digest, ext, prefix=''):
+        return os.path.join(prefix, digest[:2], digest[2:4], f"{digest}.{ext.lower()}")
+
+    def put_bytes(self, data, ext, prefix=''):
+        digest = hashlib.sha256(data).hexdigest()
+        return self._submit(self.relpath(digest, ext, prefix), lambda f: f.write(data))
+
+    def put_stream(self, stream, ext, prefix=''):
+        # Hashes while copying into a spooled buffer; only uploads larger than
+        # SPOOL_MAX_BYTES touch disk before the background write.
+        digest = hashlib.sha256()
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, dir=self.tmp_dir)
+        while True:
+            chunk = stream.read(STREAM_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spool.write(chunk)
+        if not spool.tell():
+            spool.close()
+            return None
+
+        def write(f):
+            spool.seek(0)
+            shutil.copyfileobj(spool, f, STREAM_CHUNK)
+
+        try:
+            return self._submit(self.relpath(digest.hexdigest(), ext, prefix), write, spool.close)
+        except Exception:
+            spool.close()
+            raise
+
+    def path(self, relative_path, timeout=None):
+        with self._lock:
+            future = self._pending.get(relative_path)
+        if future is not None:
+            future.result(timeout)
+        return os.path.join(self.root, relative_path)
+
+    def thumbnail(self, relative_path, timeout=None):
+        self.path(relative_path, timeout)
+        thumb = os.path.join(self.root, thumbnail_relpath(relative_path))
+        return thumb if os.path.exists(thumb) else None
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def _submit(self, relative_path, write, cleanup=None):
+        full_path = os.path.join(self.root, relative_path)
+        with self._lock:
+            if relative_path in self._pending or os.path.exists(full_path):
+                # Same content is already stored or on its way.
+                if cleanup:
+                    cleanup()
+                return relative_path
+            self._pending[relative_path] = self._pool.submit(self._write, relative_path, write, cleanup)
+        return relative_path
+
+    def _write(self, relative_path, write, cleanup):
+        full_path = os.path.join(self.root, relative_path)
+        try:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.tmp_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp, full_path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+            if self.thumbnails:
+                try:
+                    make_thumbnail(full_path, os.path.join(self.root, thumbnail_relpath(relative_path)))
+                except (cv2.error, OSError) as e:
+                    print(f"⚠️ Thumbnail failed for {relative_path}: {e}")
+        finally:
+            if cleanup:
+                cleanup()
+            with self._lock:
+                self._pending.pop(relative_path, None)
+        return full_path
@@ -0,0 +1,94 @@
+import math
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def radius_bbox(lat, lng, radius_m):
+    # (min_lat, min_lng, max_lat, max_lng) enclosing the circle.
+    dlat = radius_m / METERS_PER_DEGREE
+    dlng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0)
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_decode(geohash):
+    # Centre (lat, lng) of the cell.
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+
+def geohash_cell_size(precision):
+    # (height, width) of a cell in degrees.
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def geohash_cover(min_lat, min_lng, max_lat, max_lng, max_cells=32, max_precision=GEOHASH_PRECISION):
+    # Geohash prefixes covering the box, at the finest precision that needs
+    # at most max_cells of them. Each prefix is one index range scan.
+    best = [""]
+    for precision in range(1, max_precision + 1):
+        height, width = geohash_cell_size(precision)
+        rows = range(int((min_lat + 90) // height), min(int((max_lat + 90) // height), round(180 / height) - 1) + 1)
+        cols = range(int((min_lng + 180) // width), min(int((max_lng + 180) // width), round(360 / width) - 1) + 1)
+        if len(rows) * len(cols) > max_cells:
+            break
+        best = sorted({geohash_encode(min(-90 + (i + 0.5) * height, 90.0),
+                                      min(-180 + (j + 0.5) * width, 180.0), precision)
+                       for i in rows for j in cols})
+    return best
+
+
+def geohash_successor(prefix):
+    # Smallest geohash after every hash starting with prefix, so a prefix is
+    # the range [prefix, successor); None when the range runs to the end.
+    prefix = prefix.rstrip(GEOHASH_ALPHABET[-1])
+    if not prefix:
+        return None
+    return prefix[:-1] + GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(prefix[-1]) + 1]
+
+
+def zoom_precision(zoom):
+    # Cluster cells a few times smaller than a web-map tile at this zoom.
+    return max(1, min(GEOHASH_PRECISION, int((zoom + 3) * 2 / 5)))